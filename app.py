@@ -1,43 +1,87 @@
 import os
+import posixpath
+import io
 import tempfile
 import zipfile
 import subprocess
 import shutil
 import logging
-from flask import Flask, request, send_file, jsonify
+import logging.handlers
+import atexit
+import base64
+import errno
+import functools
+import http.client
+import itertools
+import hashlib
+import json
+import queue
+import socket
+import threading
+import time
+import urllib.request
+import urllib.error
+from flask import Flask, Request, Response, request, send_file, jsonify
 from flask_cors import CORS
+from werkzeug.datastructures import FileStorage, MultiDict
 from werkzeug.utils import secure_filename
 import uuid
 import re
-from typing import Optional, Tuple, List, Dict, Any
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Optional, Tuple, List, Dict, Any, Iterable, NamedTuple, FrozenSet
 
 # Try to import optional dependencies
 try:
     import fitz  # PyMuPDF for PDF processing
+    from pdf_extract import pdf_pages_markdown, pdf_page_range_markdown
     PYMUPDF_AVAILABLE = True
 except ImportError:
     PYMUPDF_AVAILABLE = False
     fitz = None
 
 try:
-    from pptx import Presentation  # python-pptx for PPTX processing
+    from lxml import etree  # lxml for reading PPTX slide XML
     PPTX_AVAILABLE = True
 except ImportError:
     PPTX_AVAILABLE = False
-    Presentation = None
+    etree = None
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. Records are handed to a background thread that writes them, so a
+# request thread never waits on a slow stdout/stderr pipe; LOG_LEVEL=WARNING quiets it
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+_log_level_valid = isinstance(logging.getLevelName(LOG_LEVEL), int)
+_log_handler = logging.StreamHandler()
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.basicConfig(level=LOG_LEVEL if _log_level_valid else logging.INFO,
+                    handlers=[logging.handlers.QueueHandler(_log_queue)])
+
+def _log_directly_after_fork():
+    # A forked pool process doesn't inherit the listener thread, so it writes its own records
+    logging.getLogger().handlers = [_log_handler]
+
+os.register_at_fork(after_in_child=_log_directly_after_fork)
 logger = logging.getLogger(__name__)
+if not _log_level_valid:
+    logger.warning("Unknown LOG_LEVEL %r, logging at INFO", LOG_LEVEL)
 
 app = Flask(__name__)
 CORS(app)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50 MB limit
+# Behind Apache/lighttpd, let the front-end server send result archives (emits X-Sendfile)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+# Behind nginx, the internal location that serves OUTPUT_FOLDER (e.g. /protected-output/);
+# archives are then handed off with X-Accel-Redirect instead
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '')
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
-ALLOWED_EXTENSIONS = {
+ALLOWED_EXTENSIONS = frozenset({
     'docx', 'doc', 'odt', 'rtf', 'html', 'htm', 'txt', 'md', 'markdown', 
     'tex', 'latex', 'epub', 'mobi', 'fb2', 'opml', 'org', 'mediawiki', 
     'dokuwiki', 'textile', 'rst', 'asciidoc', 'man', 'ms', 'docbook', 'xml',
@@ -45,8 +89,234 @@ ALLOWED_EXTENSIONS = {
     'json', 'native', 'typst', 'djot', 'creole', 'tikiwiki', 'twiki', 'vimwiki',
     'muse', 'pod', 't2t', 'haddock', 'mdoc', 'biblatex', 'bibtex', 'bits',
     'pdf', 'pptx'  # Added PDF and PPTX support
+})
+
+# Pandoc reader used for each uploaded file extension
+INPUT_FORMAT_MAPPING = {
+    'docx': 'docx',
+    'doc': 'doc',
+    'odt': 'odt',
+    'rtf': 'rtf',
+    'html': 'html',
+    'htm': 'html',
+    'txt': 'markdown',  # Use markdown for txt input
+    'md': 'commonmark_x',  # See MARKDOWN_READERS
+    'markdown': 'commonmark_x',
+    'tex': 'latex',
+    'latex': 'latex',
+    'epub': 'epub',
+    'mobi': 'mobi',
+    'fb2': 'fb2',
+    'opml': 'opml',
+    'org': 'org',
+    'mediawiki': 'mediawiki',
+    'dokuwiki': 'dokuwiki',
+    'textile': 'textile',
+    'rst': 'rst',
+    'asciidoc': 'asciidoc',
+    'man': 'man',
+    'ms': 'ms',
+    'docbook': 'docbook',
+    'xml': 'docbook',  # Default XML format
+    'jats': 'jats',
+    'tei': 'tei',
+    'ris': 'ris',
+    'csljson': 'csljson',
+    'endnotexml': 'endnotexml',
+    'ipynb': 'ipynb',
+    'csv': 'csv',
+    'tsv': 'tsv',
+    'json': 'json',
+    'native': 'native',
+    'typst': 'typst',
+    'djot': 'djot',
+    'creole': 'creole',
+    'tikiwiki': 'tikiwiki',
+    'twiki': 'twiki',
+    'vimwiki': 'vimwiki',
+    'muse': 'muse',
+    'pod': 'pod',
+    't2t': 't2t',
+    'haddock': 'haddock',
+    'mdoc': 'mdoc',
+    'biblatex': 'biblatex',
+    'bibtex': 'bibtex',
+    'bits': 'bits',
+    'pdf': 'pdf',  # Added PDF support
+    'pptx': 'pptx'  # Added PPTX support
+}
+
+# Readers accepted by the markdown_reader form field. .md uploads default to commonmark_x,
+# which parses in linear time where Pandoc's own markdown reader can backtrack badly
+MARKDOWN_READERS = {
+    'commonmark_x', 'commonmark', 'gfm', 'markdown', 'markdown_strict', 'markdown_phpextra', 'markdown_mmd'
+}
+
+# User-friendly output format names and the Pandoc writer each one selects; names
+# not listed here are passed to Pandoc unchanged
+OUTPUT_FORMAT_ALIASES = {
+    'txt': 'plain',  # Pandoc uses 'plain' for plain text, not 'txt'
+    'text': 'plain',
+    'plaintext': 'plain',
+    'word': 'docx',
+    'powerpoint': 'pptx',
+    'presentation': 'pptx',
+    'document': 'docx',
+    'webpage': 'html',
+    'web': 'html',
+    'page': 'html',
+    'notebook': 'ipynb',
+    'jupyter': 'ipynb',
+    'ebook': 'epub',
+    'book': 'epub',
+    'slide': 'revealjs',
+    'slides': 'revealjs',
+    'deck': 'revealjs',
+    'beamer_slide': 'beamer',
+    'latex_slide': 'beamer',
+    'pdf_slide': 'beamer',
+    'markdown_github': 'gfm',
+    'github_markdown': 'gfm',
+    'github': 'gfm',
+    'commonmark_x_extended': 'commonmark_x',
+    'extended_commonmark': 'commonmark_x',
+    'markua_document': 'markua',
+    'spip_wiki': 'spip',
+    'epub_version2': 'epub2',
+    'epub_version3': 'epub3',
+    'docbook_version4': 'docbook4',
+    'docbook_version5': 'docbook5',
+    'jats_archiving_version': 'jats_archiving',
+    'jats_publishing_version': 'jats_publishing',
+    'jats_article_authoring': 'jats_articleauthoring',
+    'html_version5': 'html5',
+    'html_version4': 'html4',
+    'xhtml_version5': 'xhtml5',
+    'xhtml_version4': 'xhtml4',
+    'commonmark_strict': 'commonmark',
+    'commonmark_extended': 'commonmark_x',
+    'github_flavored': 'gfm',
+    'tex_info': 'texinfo',
+    'textile_wiki': 'textile',
+    'org_mode': 'org',
+    'emacs_org': 'org',
+    'ascii_doc': 'asciidoc',
+    'restructuredtext': 'rst',
+    'rest': 'rst',
+    'wiki': 'mediawiki',
+    'wikipedia': 'mediawiki',
+    'doku_wiki': 'dokuwiki',
+    'haskell_doc': 'haddock',
+    'outline': 'opml',
+    'fictionbook': 'fb2',
+    'kindle': 'mobi',
+    'indesign': 'icml',
+    'text_encoding_initiative': 'tei',
+    'pandoc_native': 'native',
+    'javascript_object_notation': 'json'
+}
+
+# File extension used for each Pandoc output format
+FORMAT_EXTENSIONS = {
+    'gfm': 'md',
+    'markdown': 'md',
+    'html': 'html',
+    'latex': 'tex',
+    'pdf': 'pdf',
+    'docx': 'docx',
+    'odt': 'odt',
+    'rtf': 'rtf',
+    'epub': 'epub',
+    'pptx': 'pptx',
+    'xml': 'xml',
+    'txt': 'txt',
+    'plain': 'txt',
+    'docbook': 'xml',
+    'jats': 'xml',
+    'opendocument': 'odt',
+    'revealjs': 'html',
+    'beamer': 'pdf',
+    's5': 'html',
+    'slideous': 'html',
+    'dzslides': 'html',
+    'slidy': 'html',
+    'asciidoc': 'adoc',
+    'rst': 'rst',
+    'org': 'org',
+    'textile': 'textile',
+    'mediawiki': 'wiki',
+    'dokuwiki': 'txt',
+    'haddock': 'hs',
+    'man': 'man',
+    'ms': 'ms',
+    'opml': 'opml',
+    'fb2': 'fb2',
+    'mobi': 'mobi',
+    'icml': 'icml',
+    'tei': 'xml',
+    'native': 'native',
+    'json': 'json',
+    'docbook5': 'xml',
+    'docbook4': 'xml',
+    'jats_archiving': 'xml',
+    'jats_publishing': 'xml',
+    'jats_articleauthoring': 'xml',
+    'html5': 'html',
+    'html4': 'html',
+    'xhtml': 'xhtml',
+    'xhtml5': 'xhtml',
+    'xhtml4': 'xhtml',
+    'markdown_github': 'md',
+    'markdown_mmd': 'md',
+    'markdown_phpextra': 'md',
+    'markdown_strict': 'md',
+    'markdown_texinfo': 'texi',
+    'commonmark': 'md',
+    'commonmark_x': 'md',
+    'markua': 'md',
+    'spip': 'txt',
+    'epub2': 'epub',
+    'epub3': 'epub',
+    'texinfo': 'texi'
 }
 
+# Archive entries that are already compressed (zip-based documents, PDFs, extracted
+# images and archives); DEFLATE would only burn CPU on them, so they are stored as-is
+INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    'docx', 'odt', 'odp', 'ods', 'epub', 'pptx', 'xlsx', 'pdf', 'mobi',
+    'png', 'jpg', 'jpeg', 'jfif', 'jp2', 'wdp', 'gif', 'webp', 'avif', 'heic', 'tif', 'tiff',
+    'mp3', 'm4a', 'ogg', 'mp4', 'mov', 'webm', 'woff2', 'zip', 'gz', 'bz2', 'xz', 'zst', '7z'
+})
+
+# Fast DEFLATE level for text outputs: much cheaper than the default 6 for a small size cost
+ZIP_COMPRESSLEVEL = 1
+
+# Uploads up to this size are kept in memory and handed to Pandoc directly
+SMALL_UPLOAD_BYTES = int(os.environ.get('SMALL_UPLOAD_BYTES', 1024 * 1024))
+
+# Inputs that are preprocessed from a file on disk before Pandoc sees them
+DISK_INPUT_FORMATS = {'pdf', 'pptx'}
+
+# CPUs this worker process may use: the host's CPUs split evenly between the WEB_CONCURRENCY
+# gunicorn workers (gunicorn.conf.py exports the count it starts), so per-worker pools don't multiply
+WORKER_CPUS = max(1, (os.cpu_count() or 1) // max(1, int(os.environ.get('WEB_CONCURRENCY', 1))))
+
+# Number of Pandoc conversions this worker process runs concurrently across all requests
+PANDOC_WORKERS = max(1, int(os.environ.get('PANDOC_WORKERS', min(WORKER_CPUS, 5))))
+
+# Run conversions in a process pool instead of threads, for when Python-side
+# pre/post-processing would otherwise contend on the GIL
+PANDOC_PROC_POOL = os.environ.get('PANDOC_PROC_POOL', '').lower() in ('1', 'true', 'yes')
+
+# PDF text extraction is pure Python/PyMuPDF CPU work, so long documents are split
+# into page ranges of PDF_PAGES_PER_TASK extracted in PDF_WORKERS processes
+PDF_WORKERS = max(1, int(os.environ.get('PDF_WORKERS', WORKER_CPUS)))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 20))
+PDF_PAGES_PER_TASK = max(1, int(os.environ.get('PDF_PAGES_PER_TASK', 10)))
+
+# Keep one `pandoc server` per worker process; set PANDOC_SERVER=0 to always run the CLI
+PANDOC_SERVER_ENABLED = os.environ.get('PANDOC_SERVER', '1').lower() not in ('0', 'false', 'no')
+
 # Create directories if they don't exist
 try:
     logger.info("Creating uploads directory...")
@@ -58,16 +328,158 @@ except Exception as e:
     logger.error(f"Error creating directories: {e}")
     raise
 
-# Check Pandoc availability at startup
-# try:
-#     logger.info("Checking Pandoc availability...")
-#     result = subprocess.run(['pandoc', '--version'], capture_output=True, text=True, timeout=10)
-#     if result.returncode == 0:
-#         logger.info(f"Pandoc is available: {result.stdout.split('\n')[0]}")
-#     else:
-#         logger.warning("Pandoc check failed")
-# except Exception as e:
-#     logger.warning(f"Could not check Pandoc: {e}")
+# Per-worker scratch root for request sessions; each session is removed once its
+# response is sent and the whole root goes away when the worker exits. The pid in
+# the name lets a later worker recognise roots left behind by a crashed one
+SESSION_ROOT_PREFIX = 'pandoc-'
+
+# Session files are short-lived, so they go to tmpfs when it has room for a few maximum-size
+# requests; CONV_TMPDIR overrides the choice, otherwise the system temp dir is used
+SCRATCH_MIN_FREE = int(os.environ.get('SCRATCH_MIN_FREE', 4 * app.config['MAX_CONTENT_LENGTH']))
+
+def choose_scratch_dir() -> Optional[str]:
+    """Return the directory session roots are created in (None means tempfile's default)"""
+    if os.environ.get('CONV_TMPDIR'):
+        return os.environ['CONV_TMPDIR']
+    shm_dir = '/dev/shm'
+    try:
+        if os.access(shm_dir, os.W_OK) and shutil.disk_usage(shm_dir).free >= SCRATCH_MIN_FREE:
+            return shm_dir
+    except OSError:
+        pass
+    return None
+
+SESSION_ROOT = tempfile.mkdtemp(prefix=f'{SESSION_ROOT_PREFIX}{os.getpid()}-', dir=choose_scratch_dir())
+logger.info(f"Session scratch root: {SESSION_ROOT}")
+
+class UploadRequest(Request):
+    """Request that spools large uploads to named files under SESSION_ROOT.
+    
+    Werkzeug's default spool is an anonymous temp file that has to be copied into the
+    session; a named file on the same filesystem lets save_upload hard-link it instead.
+    """
+    
+    # Werkzeug's own threshold: smaller request bodies are parsed into memory
+    SPOOL_TO_DISK_BYTES = 500 * 1024
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is None or total_content_length > self.SPOOL_TO_DISK_BYTES:
+            # Removed when Werkzeug closes the upload at the end of the request
+            return tempfile.NamedTemporaryFile('wb+', prefix='spool-', dir=SESSION_ROOT)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+app.request_class = UploadRequest
+atexit.register(shutil.rmtree, SESSION_ROOT, ignore_errors=True)
+
+# Content-addressed cache of converted outputs shared by all workers; 0 bytes disables it
+CONVERSION_CACHE_DIR = os.environ.get('CONVERSION_CACHE_DIR', os.path.join(OUTPUT_FOLDER, '_cache'))
+CONVERSION_CACHE_MAX_BYTES = int(os.environ.get('CONVERSION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Status files of background (async=1) conversions; on disk so any worker can answer a poll
+ASYNC_JOBS_DIR = os.path.join(OUTPUT_FOLDER, '_jobs')
+
+# Archives handed to the front-end server are swept once older than this many seconds
+CLEANUP_MAX_AGE = int(os.environ.get('CLEANUP_MAX_AGE', 15 * 60))
+CLEANUP_SWEEP_INTERVAL = 60
+
+_cleanup_queue = queue.Queue()
+
+def schedule_cleanup(path: str) -> None:
+    """Queue a file or directory for removal on the background cleanup thread"""
+    _cleanup_queue.put(path)
+
+def remove_path(path: str) -> None:
+    """Remove a file or directory tree, ignoring anything that is already gone"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def sweep_stale_archives(max_age: int) -> None:
+    """Delete result archives and async job status files last modified more than max_age seconds ago.
+    
+    A running async job keeps its status file fresh (see run_async_job), so only finished or
+    abandoned jobs expire; .part archives are left behind by workers that died mid-write.
+    """
+    cutoff = time.time() - max_age
+    with os.scandir(OUTPUT_FOLDER) as it:
+        for entry in it:
+            if entry.name.startswith('converted_files_') and entry.name.endswith(('.zip', '.zip.part')) \
+                    and entry.stat().st_mtime < cutoff:
+                logger.info(f"Removing stale archive {entry.name}")
+                remove_path(entry.path)
+    
+    try:
+        with os.scandir(ASYNC_JOBS_DIR) as it:
+            for entry in it:
+                if entry.stat().st_mtime < cutoff:
+                    remove_path(entry.path)
+    except FileNotFoundError:
+        pass
+
+def sweep_orphaned_sessions(max_age: int) -> None:
+    """Delete session data that no running worker will clean up.
+    
+    That is scratch roots of workers that died without running atexit, and per-session
+    OUTPUT_FOLDER/<uuid> directories from the layout used before SESSION_ROOT existed.
+    """
+    scratch_dir = os.path.dirname(SESSION_ROOT)
+    with os.scandir(scratch_dir) as it:
+        for entry in it:
+            pid, dash, _ = entry.name[len(SESSION_ROOT_PREFIX):].partition('-')
+            if not (entry.name.startswith(SESSION_ROOT_PREFIX) and dash and pid.isdigit()) \
+                    or entry.path == SESSION_ROOT or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                os.kill(int(pid), 0)
+                continue  # owner is still running
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                continue  # alive, owned by another user
+            logger.info(f"Removing scratch directory of exited worker {pid}: {entry.path}")
+            remove_path(entry.path)
+    
+    cutoff = time.time() - max_age
+    with os.scandir(OUTPUT_FOLDER) as it:
+        for entry in it:
+            try:
+                uuid.UUID(entry.name)
+            except ValueError:
+                continue
+            if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                logger.info(f"Removing stale session directory {entry.name}")
+                remove_path(entry.path)
+
+def cleanup_worker():
+    """Remove queued session paths off the request path and periodically sweep stale archives"""
+    # Once per worker is enough: a crashed worker is replaced by a new one, whose own startup sweep catches it
+    try:
+        sweep_orphaned_sessions(CLEANUP_MAX_AGE)
+    except Exception as e:
+        logger.error(f"Error sweeping orphaned sessions: {str(e)}")
+    
+    next_sweep = time.monotonic() + CLEANUP_SWEEP_INTERVAL
+    while True:
+        try:
+            remove_path(_cleanup_queue.get(timeout=max(0.0, next_sweep - time.monotonic())))
+        except queue.Empty:
+            pass
+        except Exception as e:
+            logger.error(f"Error during session cleanup: {str(e)}")
+        
+        if time.monotonic() >= next_sweep:
+            try:
+                sweep_stale_archives(CLEANUP_MAX_AGE)
+                conversion_cache.prune()
+            except Exception as e:
+                logger.error(f"Error sweeping stale archives: {str(e)}")
+            next_sweep = time.monotonic() + CLEANUP_SWEEP_INTERVAL
+
+threading.Thread(target=cleanup_worker, name='session-cleanup', daemon=True).start()
 
 logger.info("Application startup completed")
 
@@ -75,98 +487,165 @@ print("ALL ENV VARS:", dict(os.environ))
 
 print("PORT ENV:", os.environ.get("PORT"))
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+class ConversionJob(NamedTuple):
+    """A single uploaded file queued for conversion"""
+    filename: str
+    input_path: str
+    input_format: str
+    output_filename: str
+    output_path: str
+    media_dir: str
+    # Content of a small upload kept in memory; input_path is then never written
+    data: Optional[bytes] = None
 
-def get_input_format(filename):
-    """Determine input format based on file extension"""
-    ext = filename.rsplit('.', 1)[1].lower()
-    
-    format_mapping = {
-        'docx': 'docx',
-        'doc': 'doc',
-        'odt': 'odt',
-        'rtf': 'rtf',
-        'html': 'html',
-        'htm': 'html',
-        'txt': 'markdown',  # Use markdown for txt input
-        'md': 'markdown',
-        'markdown': 'markdown',
-        'tex': 'latex',
-        'latex': 'latex',
-        'epub': 'epub',
-        'mobi': 'mobi',
-        'fb2': 'fb2',
-        'opml': 'opml',
-        'org': 'org',
-        'mediawiki': 'mediawiki',
-        'dokuwiki': 'dokuwiki',
-        'textile': 'textile',
-        'rst': 'rst',
-        'asciidoc': 'asciidoc',
-        'man': 'man',
-        'ms': 'ms',
-        'docbook': 'docbook',
-        'xml': 'docbook',  # Default XML format
-        'jats': 'jats',
-        'tei': 'tei',
-        'ris': 'ris',
-        'csljson': 'csljson',
-        'endnotexml': 'endnotexml',
-        'ipynb': 'ipynb',
-        'csv': 'csv',
-        'tsv': 'tsv',
-        'json': 'json',
-        'native': 'native',
-        'typst': 'typst',
-        'djot': 'djot',
-        'creole': 'creole',
-        'tikiwiki': 'tikiwiki',
-        'twiki': 'twiki',
-        'vimwiki': 'vimwiki',
-        'muse': 'muse',
-        'pod': 'pod',
-        't2t': 't2t',
-        'haddock': 'haddock',
-        'mdoc': 'mdoc',
-        'biblatex': 'biblatex',
-        'bibtex': 'bibtex',
-        'bits': 'bits',
-        'pdf': 'pdf',  # Added PDF support
-        'pptx': 'pptx'  # Added PPTX support
-    }
+def save_upload(file_storage, path: str) -> None:
+    """Write an uploaded file to disk without Python-level chunk copying where possible"""
+    src = file_storage.stream
+    if isinstance(src, tempfile.SpooledTemporaryFile):
+        # Calling fileno() on the spool would force a rollover, so work with the backing file directly
+        src = src._file
+    
+    spool_name = getattr(src, 'name', None)
+    if isinstance(spool_name, str):
+        # Named spool file from UploadRequest: give it a second name instead of copying the data
+        try:
+            src.flush()
+            os.link(spool_name, path)
+            return
+        except (AttributeError, OSError):
+            pass
     
-    return format_mapping.get(ext, 'markdown')
+    with open(path, 'wb') as dst:
+        if isinstance(src, io.BytesIO):
+            # Small upload still held in memory: write its buffer in one call
+            with src.getbuffer() as view:
+                dst.write(view[src.tell():])
+            return
+        
+        try:
+            src_fd = src.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            src_fd = None
+        
+        if src_fd is not None and hasattr(os, 'sendfile'):
+            # Upload was spooled to a temp file: let the kernel copy it
+            offset = src.tell()
+            remaining = os.fstat(src_fd).st_size - offset
+            while remaining > 0:
+                sent = os.sendfile(dst.fileno(), src_fd, offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        else:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
 
-def get_format_suggestions(invalid_format):
-    """Get suggestions for similar or common formats when an invalid format is entered"""
-    common_formats = {
-        'pdf': ['pdf'],
-        'word': ['docx'],
-        'powerpoint': ['pptx'],
-        'html': ['html', 'html5', 'xhtml'],
-        'markdown': ['markdown', 'gfm', 'commonmark'],
-        'text': ['txt', 'plain'],
-        'xml': ['xml', 'docbook', 'jats', 'tei'],
-        'latex': ['latex', 'tex'],
-        'epub': ['epub', 'epub2', 'epub3'],
-        'presentation': ['revealjs', 'beamer', 's5', 'slidy'],
-        'documentation': ['docbook', 'jats', 'asciidoc', 'rst']
-    }
+def read_small_upload(file_storage, limit: int) -> Optional[bytes]:
+    """Return the upload's bytes if it is at most limit bytes long, otherwise None (stream left rewound)"""
+    src = file_storage.stream
+    start = src.tell()
+    data = src.read(limit + 1)
+    if len(data) <= limit:
+        return data
+    src.seek(start)
+    return None
+
+# Leading bytes that identify an upload's real format whatever its extension says
+INPUT_MAGIC_BYTES = ((b'%PDF-', 'pdf'), (b'{\\rtf', 'rtf'))
+
+# Readers that take ZIP containers; ODF and EPUB name their type in a leading 'mimetype' member
+ZIP_INPUT_FORMATS = {'docx', 'odt', 'epub', 'pptx'}
+ZIP_MIMETYPES = {b'application/vnd.oasis.opendocument.text': 'odt', b'application/epub+zip': 'epub'}
+
+def peek_upload(file_storage, size: int = 512) -> bytes:
+    """Return the first size bytes of an upload, leaving its stream where it was"""
+    src = file_storage.stream
+    start = src.tell()
+    head = src.read(size)
+    src.seek(start)
+    return head
+
+def sniff_input_format(head: bytes, input_format: str) -> Optional[str]:
+    """Reader that an upload's leading bytes call for, when it isn't the one its extension chose.
     
-    suggestions = []
-    invalid_lower = invalid_format.lower()
+    Returns 'zip' for a ZIP container of unknown type named like a non-ZIP format, and None
+    when the extension can be trusted (including for all text content).
+    """
+    for magic, sniffed in INPUT_MAGIC_BYTES:
+        if head.startswith(magic):
+            return sniffed if sniffed != input_format else None
     
-    for category, formats in common_formats.items():
-        if invalid_lower in category or any(invalid_lower in fmt for fmt in formats):
-            suggestions.extend(formats)
+    if not head.startswith(b'PK\x03\x04'):
+        return None
+    # Local file header: name length at offset 26, extra length at 28, name from 30, data after
+    name_len = int.from_bytes(head[26:28], 'little')
+    data_start = 30 + name_len + int.from_bytes(head[28:30], 'little')
+    if head[30:30 + name_len] == b'mimetype':
+        for mimetype, sniffed in ZIP_MIMETYPES.items():
+            if head[data_start:data_start + len(mimetype)] == mimetype:
+                return sniffed if sniffed != input_format else None
+    return 'zip' if input_format not in ZIP_INPUT_FORMATS else None
+
+def parse_upload_filename(filename: str) -> Optional[Tuple[str, str, str, str]]:
+    """Parse an uploaded filename once, returning (safe_filename, base_name, ext, input_format) or None if not allowed.
+    
+    ext is the lowercased extension; callers reuse these parts rather than splitting the name again.
+    """
+    _, dot, ext = filename.rpartition('.')
+    ext = ext.lower()
+    if not dot or ext not in ALLOWED_EXTENSIONS:
+        return None
     
-    # Add some common formats if no specific matches
-    if not suggestions:
-        suggestions = ['pdf', 'docx', 'html', 'markdown', 'txt', 'xml']
+    safe_filename = secure_filename(filename)
+    base_name, dot, _ = safe_filename.rpartition('.')
+    if not dot:
+        # secure_filename can drop the extension entirely (e.g. non-ASCII names), so restore it
+        base_name = safe_filename or 'upload'
+        safe_filename = f"{base_name}.{ext}"
     
-    return list(set(suggestions))[:5]  # Return up to 5 unique suggestions
+    return safe_filename, base_name, ext, INPUT_FORMAT_MAPPING.get(ext, 'markdown')
+
+def allowed_file(filename):
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in ALLOWED_EXTENSIONS
+
+def get_input_format(filename):
+    """Determine input format based on file extension"""
+    return INPUT_FORMAT_MAPPING.get(filename.rpartition('.')[2].lower(), 'markdown')
+
+# Output formats suggested for an unrecognised name, by category; each category's
+# name and formats are matched as one search string per category
+FORMAT_SUGGESTIONS = tuple(
+    (' '.join((category, *formats)), formats) for category, formats in {
+        'pdf': ('pdf',),
+        'word': ('docx',),
+        'powerpoint': ('pptx',),
+        'html': ('html', 'html5', 'xhtml'),
+        'markdown': ('markdown', 'gfm', 'commonmark'),
+        'text': ('txt', 'plain'),
+        'xml': ('xml', 'docbook', 'jats', 'tei'),
+        'latex': ('latex', 'tex'),
+        'epub': ('epub', 'epub2', 'epub3'),
+        'presentation': ('revealjs', 'beamer', 's5', 'slidy'),
+        'documentation': ('docbook', 'jats', 'asciidoc', 'rst'),
+    }.items()
+)
+DEFAULT_FORMAT_SUGGESTIONS = ('pdf', 'docx', 'html', 'markdown', 'txt')
+
+@functools.lru_cache(maxsize=256)
+def _format_suggestions(invalid_lower: str) -> Tuple[str, ...]:
+    # Spaces never occur in format names, so a match can't span two of them
+    if ' ' in invalid_lower:
+        return DEFAULT_FORMAT_SUGGESTIONS
+    suggestions = itertools.chain.from_iterable(
+        formats for search, formats in FORMAT_SUGGESTIONS if invalid_lower in search
+    )
+    # dict.fromkeys drops repeats while keeping the categories' order
+    return tuple(dict.fromkeys(suggestions))[:5] or DEFAULT_FORMAT_SUGGESTIONS
+
+def get_format_suggestions(invalid_format):
+    """Get suggestions for similar or common formats when an invalid format is entered"""
+    return list(_format_suggestions(invalid_format.lower()))  # Up to 5 unique suggestions
 
 def is_format_supported(output_format):
     """Check if the output format is supported by Pandoc - now more permissive"""
@@ -174,37 +653,57 @@ def is_format_supported(output_format):
     # This makes the system more flexible for custom formats
     return True
 
+# Leading bytes every well-formed output of these formats starts with
+OUTPUT_MAGIC_BYTES = {
+    'pdf': b'%PDF-',
+    'docx': b'PK\x03\x04',
+    'pptx': b'PK\x03\x04',
+    'odt': b'PK\x03\x04',
+    'epub': b'PK\x03\x04',
+    'epub2': b'PK\x03\x04',
+    'epub3': b'PK\x03\x04',
+}
+
+# Outputs checked by size and magic number rather than for text content
+BINARY_OUTPUT_FORMATS = frozenset({'pdf', 'docx', 'pptx', 'odt', 'epub', 'epub2', 'epub3', 'mobi', 'fb2'})
+
+# Text outputs up to this size are read back to reject whitespace-only results;
+# longer ones are accepted on their size alone
+TEXT_OUTPUT_CHECK_BYTES = 4096
+
 def validate_output_file(output_path, output_format):
     """Validate that the output file was created correctly for the given format"""
     try:
-        # Check if file exists and has content
-        if not os.path.exists(output_path):
+        binary = output_format in BINARY_OUTPUT_FORMATS
+        magic = OUTPUT_MAGIC_BYTES.get(output_format, b'') if binary else b''
+        
+        # One open + fstat, plus a header read only when a check below needs the bytes
+        try:
+            fd = os.open(output_path, os.O_RDONLY)
+        except FileNotFoundError:
             return False, "Output file was not created"
+        try:
+            file_size = os.fstat(fd).st_size
+            if binary:
+                head = os.pread(fd, len(magic), 0) if magic and file_size else b''
+            else:
+                head = os.pread(fd, file_size, 0) if 0 < file_size <= TEXT_OUTPUT_CHECK_BYTES else b''
+        finally:
+            os.close(fd)
         
-        file_size = os.path.getsize(output_path)
         if file_size == 0:
             return False, "Output file is empty"
         
-        # Basic validation for any format - just check if file has content
-        # This allows maximum flexibility for any output format
-        
-        # For binary formats, just check file size
-        if output_format in ['pdf', 'docx', 'pptx', 'odt', 'epub', 'mobi', 'fb2']:
+        # For binary formats, check size and, where the format has one, the magic number
+        if binary:
             if file_size < 50:  # Even small binary files should have some content
                 return False, f"Output {output_format} file appears to be corrupted (too small)"
+            if not head.startswith(magic):
+                return False, f"Output {output_format} file appears to be corrupted (unexpected header)"
         
-        # For text-based formats, check for content
-        else:
-            try:
-                with open(output_path, 'r', encoding='utf-8') as f:
-                    content = f.read(100)  # Read first 100 chars
-                    if not content.strip():
-                        return False, f"Output {output_format} file is empty"
-            except UnicodeDecodeError:
-                # If it's not UTF-8, it might be a binary format we didn't expect
-                # Just check if it has reasonable size
-                if file_size < 50:
-                    return False, f"Output {output_format} file appears to be corrupted (too small)"
+        # For text-based formats, a short output must have more than whitespace
+        elif file_size <= TEXT_OUTPUT_CHECK_BYTES and not head.strip():
+            return False, f"Output {output_format} file is empty"
         
         # If we get here, the file appears valid
         return True, f"Output {output_format} file validated successfully"
@@ -212,151 +711,579 @@ def validate_output_file(output_path, output_format):
     except Exception as e:
         return False, f"Error validating output file: {str(e)}"
 
-def convert_file_with_pandoc(input_path, output_path, input_format, output_format, extract_media_dir):
-    """Convert file using Pandoc with precise format-specific options and enhanced media handling"""
-    try:
-        # Build base pandoc command
-        cmd = [
-            'pandoc',
-            input_path,
-            '-f', input_format,
-            '-t', output_format,
-            '-o', output_path
-        ]
-        
-        # Add media extraction for ALL formats that might contain images
-        # This ensures we capture images from any source format
-        media_supporting_formats = [
-            'html', 'html5', 'xhtml', 'epub', 'epub2', 'epub3', 'docx', 'pptx', 'odt',
-            'markdown', 'gfm', 'commonmark', 'commonmark_x', 'rst', 'asciidoc',
-            'textile', 'mediawiki', 'dokuwiki', 'org', 'opml', 'fb2', 'mobi',
-            'docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'icml'
-        ]
-        
-        # Always extract media for formats that support it, or if input might contain images
-        if output_format in media_supporting_formats or input_format in ['docx', 'pptx', 'odt', 'epub', 'html']:
-            cmd.extend(['--extract-media', extract_media_dir])
-        
-        # Add format-specific options for precise conversion
-        if output_format == 'gfm':
-            cmd.extend(['--wrap=none', '--markdown-headings=atx'])
-        elif output_format == 'markdown':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'html':
-            cmd.extend(['--standalone', '--self-contained'])
-        elif output_format == 'html5':
-            cmd.extend(['--standalone', '--self-contained', '--to=html5'])
-        elif output_format == 'xhtml':
-            cmd.extend(['--standalone', '--self-contained', '--to=xhtml'])
-        elif output_format == 'pdf':
-            cmd.extend(['--pdf-engine=xelatex'])
-        elif output_format == 'latex':
-            cmd.extend(['--standalone'])
-        elif output_format == 'docx':
-            cmd.extend(['--reference-doc='])  # Use default template
-        elif output_format == 'pptx':
-            cmd.extend(['--reference-doc='])  # Use default template
-        elif output_format == 'odt':
-            cmd.extend(['--reference-doc='])  # Use default template
-        elif output_format == 'rtf':
-            cmd.extend([])  # No special options needed
-        elif output_format == 'epub':
-            cmd.extend(['--epub-cover-image='])  # No cover image
-        elif output_format == 'epub2':
-            cmd.extend(['--to=epub2'])
-        elif output_format == 'epub3':
-            cmd.extend(['--to=epub3'])
-        elif output_format == 'txt':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'xml':
-            cmd.extend(['--standalone'])
-        elif output_format == 'docbook':
-            cmd.extend(['--standalone', '--to=docbook5'])
-        elif output_format == 'docbook5':
-            cmd.extend(['--standalone', '--to=docbook5'])
-        elif output_format == 'docbook4':
-            cmd.extend(['--standalone', '--to=docbook4'])
-        elif output_format == 'jats':
-            cmd.extend(['--standalone', '--to=jats'])
-        elif output_format == 'jats_archiving':
-            cmd.extend(['--standalone', '--to=jats_archiving'])
-        elif output_format == 'jats_publishing':
-            cmd.extend(['--standalone', '--to=jats_publishing'])
-        elif output_format == 'jats_articleauthoring':
-            cmd.extend(['--standalone', '--to=jats_articleauthoring'])
-        elif output_format == 'revealjs':
-            cmd.extend(['--standalone', '--to=revealjs'])
-        elif output_format == 'beamer':
-            cmd.extend(['--pdf-engine=xelatex', '--to=beamer'])
-        elif output_format == 's5':
-            cmd.extend(['--standalone', '--to=s5'])
-        elif output_format == 'slideous':
-            cmd.extend(['--standalone', '--to=slideous'])
-        elif output_format == 'dzslides':
-            cmd.extend(['--standalone', '--to=dzslides'])
-        elif output_format == 'slidy':
-            cmd.extend(['--standalone', '--to=slidy'])
-        elif output_format == 'asciidoc':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'rst':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'org':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'textile':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'mediawiki':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'dokuwiki':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'haddock':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'man':
-            cmd.extend([])
-        elif output_format == 'ms':
-            cmd.extend([])
-        elif output_format == 'opml':
-            cmd.extend(['--standalone'])
-        elif output_format == 'fb2':
-            cmd.extend(['--standalone'])
-        elif output_format == 'mobi':
-            cmd.extend(['--standalone'])
-        elif output_format == 'icml':
-            cmd.extend(['--standalone'])
-        elif output_format == 'tei':
-            cmd.extend(['--standalone'])
-        elif output_format == 'native':
-            cmd.extend([])
-        elif output_format == 'json':
-            cmd.extend(['--to=json'])
-        elif output_format == 'commonmark':
-            cmd.extend(['--wrap=none', '--to=commonmark'])
-        elif output_format == 'commonmark_x':
-            cmd.extend(['--wrap=none', '--to=commonmark_x'])
-        elif output_format == 'markua':
-            cmd.extend(['--wrap=none', '--to=markua'])
-        elif output_format == 'spip':
-            cmd.extend(['--wrap=none'])
-        elif output_format == 'texinfo':
-            cmd.extend(['--standalone'])
-        elif output_format == 'opendocument':
-            cmd.extend(['--to=opendocument'])
+# Options shared by many formats, so the table below reuses one tuple object for each
+_WRAP_NONE = ('--wrap=none',)
+_STANDALONE = ('--standalone',)
+_DEFAULT_REFERENCE_DOC = ('--reference-doc=',)
+
+# Format-specific Pandoc options, one dict lookup per conversion. Formats without an
+# entry are converted directly with no special options, for maximum flexibility
+PANDOC_FORMAT_OPTIONS = {
+    'gfm': ('--wrap=none', '--markdown-headings=atx'),
+    'markdown': _WRAP_NONE,
+    'html': _STANDALONE,
+    'html5': ('--standalone', '--to=html5'),
+    'xhtml': ('--standalone', '--to=xhtml'),
+    'pdf': ('--pdf-engine=xelatex',),
+    'latex': _STANDALONE,
+    'docx': _DEFAULT_REFERENCE_DOC,  # Use default template
+    'pptx': _DEFAULT_REFERENCE_DOC,  # Use default template
+    'odt': _DEFAULT_REFERENCE_DOC,  # Use default template
+    'rtf': (),
+    'epub': ('--epub-cover-image=',),  # No cover image
+    'epub2': ('--to=epub2',),
+    'epub3': ('--to=epub3',),
+    'txt': _WRAP_NONE,
+    'xml': _STANDALONE,
+    'docbook': ('--standalone', '--to=docbook5'),
+    'docbook5': ('--standalone', '--to=docbook5'),
+    'docbook4': ('--standalone', '--to=docbook4'),
+    'jats': ('--standalone', '--to=jats'),
+    'jats_archiving': ('--standalone', '--to=jats_archiving'),
+    'jats_publishing': ('--standalone', '--to=jats_publishing'),
+    'jats_articleauthoring': ('--standalone', '--to=jats_articleauthoring'),
+    'revealjs': ('--standalone', '--to=revealjs'),
+    'beamer': ('--pdf-engine=xelatex', '--to=beamer'),
+    's5': ('--standalone', '--to=s5'),
+    'slideous': ('--standalone', '--to=slideous'),
+    'dzslides': ('--standalone', '--to=dzslides'),
+    'slidy': ('--standalone', '--to=slidy'),
+    'asciidoc': _WRAP_NONE,
+    'rst': _WRAP_NONE,
+    'org': _WRAP_NONE,
+    'textile': _WRAP_NONE,
+    'mediawiki': _WRAP_NONE,
+    'dokuwiki': _WRAP_NONE,
+    'haddock': _WRAP_NONE,
+    'man': (),
+    'ms': (),
+    'opml': _STANDALONE,
+    'fb2': _STANDALONE,
+    'mobi': _STANDALONE,
+    'icml': _STANDALONE,
+    'tei': _STANDALONE,
+    'native': (),
+    'json': ('--to=json',),
+    'commonmark': ('--wrap=none', '--to=commonmark'),
+    'commonmark_x': ('--wrap=none', '--to=commonmark_x'),
+    'markua': ('--wrap=none', '--to=markua'),
+    'spip': _WRAP_NONE,
+    'texinfo': _STANDALONE,
+    'opendocument': ('--to=opendocument',),
+}
+
+def get_pandoc_options(output_format: str) -> List[str]:
+    """Return the format-specific Pandoc options for precise conversion"""
+    return list(PANDOC_FORMAT_OPTIONS.get(output_format, ()))
+
+# Extra option a request passes to turn off the format's --standalone; it is resolved here
+# rather than handed to Pandoc, whose 2.x releases don't accept a value for the flag
+NO_STANDALONE = '--standalone=false'
+
+@functools.lru_cache(maxsize=256)
+def _conversion_options(output_format: str, extra_options: Tuple[str, ...]) -> Tuple[str, ...]:
+    # Every file of a request resolves the same options, for the cache key, the server
+    # parameters and the CLI command, so each combination is only worked out once
+    options = get_pandoc_options(output_format) + list(extra_options)
+    if NO_STANDALONE in options:
+        options = [option for option in options if option not in ('--standalone', NO_STANDALONE)]
+    return tuple(options)
+
+def conversion_options(output_format: str, extra_options: Optional[List[str]] = None) -> List[str]:
+    """Return the format's Pandoc options followed by the request's extra options"""
+    return list(_conversion_options(output_format, tuple(extra_options or ())))
+
+class PandocServerError(Exception):
+    """pandoc server answered a conversion request with an error"""
+
+class PandocRunner:
+    """Runs Pandoc conversions, preferring a long-lived `pandoc server` over a subprocess per file"""
+    
+    # Input formats Pandoc reads as binary; the server expects these base64 encoded
+    BINARY_INPUT_FORMATS = {'docx', 'odt', 'epub', 'pptx', 'xlsx'}
+    
+    # Outputs the server cannot produce (PDF needs an external engine)
+    CLI_ONLY_OUTPUT_FORMATS = {'pdf', 'beamer'}
+    
+    # `pandoc server` first shipped in Pandoc 3.0, --embed-resources in 2.19
+    SERVER_MIN_VERSION = (3, 0)
+    EMBED_RESOURCES_MIN_VERSION = (2, 19)
+    
+    # Version number in the first line of `pandoc --version`, e.g. "pandoc 3.1.9"
+    VERSION_NUMBER = re.compile(r'\d+(?:\.\d+)*')
+    
+    def __init__(self, executable: str = 'pandoc', use_server: bool = True, startup_timeout: float = 10.0):
+        self.executable = executable
+        self.startup_timeout = startup_timeout
+        # One limit for both paths; PANDOC_SERVER_TIMEOUT is the older name of the setting
+        self.conversion_timeout = int(
+            os.environ.get('PANDOC_TIMEOUT', os.environ.get('PANDOC_SERVER_TIMEOUT', 120))
+        )
+        # GHC runtime heap cap for CLI runs, so a pathological input fails instead of exhausting memory
+        max_heap = os.environ.get('PANDOC_MAX_HEAP', '512M')
+        self.rts_options = ['+RTS', f'-M{max_heap}', '-RTS'] if max_heap else []
+        self._process = None
+        self._url = None
+        self._port = None
+        self._owner_pid = None
+        self._local = threading.local()
+        self._server_failed = not use_server
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_info = ()
+    
+    @property
+    def version(self) -> str:
+        """First line of `pandoc --version`, looked up once; empty if Pandoc can't be run"""
+        if self._version is None:
+            try:
+                result = subprocess.run([self.executable, '--version'], capture_output=True, text=True, timeout=10)
+                version = result.stdout.split('\n')[0]
+            except (OSError, subprocess.SubprocessError):
+                return ''
+            match = self.VERSION_NUMBER.search(version)
+            self._version_info = tuple(int(part) for part in match.group().split('.')) if match else ()
+            self._version = version
+        return self._version
+    
+    @property
+    def version_info(self) -> Tuple[int, ...]:
+        """Numeric Pandoc version, e.g. (3, 1, 9), parsed along with version; empty if it couldn't be determined"""
+        return self._version_info if self.version else ()
+    
+    @property
+    def embed_resources_option(self) -> str:
+        """Option that inlines images/CSS into HTML; releases before 2.19 only know --self-contained"""
+        if self.version_info >= self.EMBED_RESOURCES_MIN_VERSION:
+            return '--embed-resources'
+        return '--self-contained'
+    
+    def _start_server(self) -> bool:
+        """Launch `pandoc server` on a free local port and wait until it answers"""
+        if self.version_info < self.SERVER_MIN_VERSION:
+            logger.warning(f"{self.version or 'pandoc'} has no server subcommand (needs Pandoc 3.0 or newer)")
+            return False
+        
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        
+        try:
+            self._process = subprocess.Popen(
+                [self.executable, 'server', '--port', str(port), '--timeout', str(self.conversion_timeout)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            logger.warning(f"Could not start pandoc server: {e}")
+            return False
+        
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                logger.warning(f"pandoc server exited during startup with code {self._process.returncode}")
+                return False
+            try:
+                with urllib.request.urlopen(f"{url}/version", timeout=1) as response:
+                    version = response.read().decode('utf-8').strip()
+                self._url = url
+                self._port = port
+                self._owner_pid = os.getpid()
+                logger.info(f"Started pandoc server {version} on port {port}")
+                return True
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.05)
+        
+        logger.warning("pandoc server did not become ready in time")
+        self.stop()
+        return False
+    
+    def _ensure_server(self) -> bool:
+        """Start the server on first use; returns False if the CLI must be used instead"""
+        if self._url and self._owner_pid == os.getpid() and self._process.poll() is None:
+            return True
+        with self._lock:
+            if self._process is not None and self._owner_pid != os.getpid():
+                # Forked child: the inherited server belongs to the parent, start our own
+                self._process = self._url = self._owner_pid = None
+            if self._url and self._process.poll() is None:
+                return True
+            if self._server_failed:
+                return False
+            if self._process is not None:
+                logger.warning("pandoc server stopped unexpectedly, restarting it")
+                self.stop()
+            if not self._start_server():
+                self.stop()
+                self._server_failed = True
+                logger.warning("Falling back to running pandoc as a subprocess per file")
+                return False
+            atexit.register(self.stop)
+            return True
+    
+    def start(self) -> bool:
+        """Start the server ahead of the first conversion and report whether it is usable"""
+        return self._ensure_server()
+    
+    def warmup(self):
+        """Run a throwaway conversion so Pandoc's data files and libraries are paged in before the first request"""
+        try:
+            if self._ensure_server():
+                self._post({'text': '# warmup', 'from': 'markdown', 'to': 'gfm'})
+            else:
+                subprocess.run([self.executable, '-f', 'markdown', '-t', 'gfm'],
+                               input='# warmup', capture_output=True, text=True, timeout=15, check=True)
+            logger.info("Pandoc warmup conversion completed")
+        except Exception as e:
+            logger.warning(f"Pandoc warmup failed: {e}")
+    
+    def stop(self):
+        """Terminate the server process if it is running"""
+        process, self._process, self._url = self._process, None, None
+        if self._owner_pid not in (None, os.getpid()):
+            return  # Never terminate a server inherited from the parent process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    
+    @staticmethod
+    def _server_options(options: List[str]) -> Optional[Dict[str, Any]]:
+        """Translate CLI options into server request fields, or None if any has no equivalent"""
+        params = {}
+        for option in options:
+            name, _, value = option.partition('=')
+            if name == '--standalone':
+                params['standalone'] = True
+            elif name == '--wrap':
+                params['wrap'] = value
+            elif name == '--markdown-headings':
+                params['markdown-headings'] = value
+            elif name == '--to':
+                params['to'] = value
+            elif name in ('--reference-doc', '--epub-cover-image') and not value:
+                continue  # Empty value means Pandoc's default
+            else:
+                return None
+        return params
+    
+    @staticmethod
+    def _source_params(input_path: str) -> Dict[str, Any]:
+        """Server request fields naming the upload, as the CLI does for a file argument"""
+        return {'variables': {'sourcefile': os.path.basename(input_path)}}
+    
+    def _connection(self, fresh: bool = False) -> http.client.HTTPConnection:
+        """Return this thread's keep-alive connection to the server, reconnecting after a restart"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None and (fresh or self._local.url != self._url):
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = http.client.HTTPConnection('127.0.0.1', self._port, timeout=self.conversion_timeout + 5)
+            self._local.connection, self._local.url = conn, self._url
+        return conn
+    
+    def _post(self, payload: Any, path: str = '/') -> Any:
+        """Send a conversion request to the server and return its decoded JSON reply"""
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        for attempt in range(2):
+            conn = self._connection(fresh=attempt > 0)
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                # A reused connection may have been dropped by the server while idle; retry that once
+                stale = isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError))
+                if attempt or not stale:
+                    raise
+        
+        if response.status != 200:
+            raise PandocServerError(data.decode('utf-8', errors='replace'))
+        return json.loads(data)
+    
+    def _read_input(self, input_path: str, input_format: str, data: Optional[bytes] = None) -> str:
+        """Load an input (file or in-memory upload) as the server's `text` field (base64 for binary formats)"""
+        if data is None:
+            with open(input_path, 'rb') as f:
+                data = f.read()
+        if input_format in self.BINARY_INPUT_FORMATS:
+            return base64.b64encode(data).decode('ascii')
+        return data.decode('utf-8')
+    
+    @staticmethod
+    def _write_output(result: Dict[str, Any], output_path: str) -> None:
+        """Write one server conversion result to output_path"""
+        if result.get('base64'):
+            with open(output_path, 'wb') as f:
+                f.write(base64.b64decode(result['output']))
         else:
-            # For any other format, try direct conversion without special options
-            # This allows maximum flexibility for custom formats
-            cmd.extend([])
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(result['output'])
         
-        # Log the command being executed (without sensitive info)
+        for message in result.get('messages', []):
+            logger.info(f"Pandoc {message.get('verbosity', 'INFO').lower()}: {message.get('message', message)}")
+    
+    def _convert_with_server(self, input_path: str, output_path: str, input_format: str,
+                             params: Dict[str, Any], data: Optional[bytes] = None) -> Tuple[bool, Optional[str]]:
+        """Convert one file through the running server"""
+        text = self._read_input(input_path, input_format, data)
+        try:
+            result = self._post({'text': text, 'from': input_format, **params, **self._source_params(input_path)})
+        except PandocServerError as e:
+            return False, f"Pandoc error: {e}"
+        
+        self._write_output(result, output_path)
+        return True, None
+    
+    def server_params(self, output_format: str, extra_options: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Server request fields for a conversion, or None when it has to run through the CLI"""
+        if output_format in self.CLI_ONLY_OUTPUT_FORMATS:
+            return None
+        params = self._server_options(conversion_options(output_format, extra_options))
+        if params is not None:
+            params.setdefault('to', output_format)
+        return params
+    
+    def convert_batch(self, items: List[Tuple[str, str, str, Optional[bytes]]], output_format: str,
+                      extra_options: Optional[List[str]] = None) -> Optional[List[Tuple[bool, Optional[str]]]]:
+        """Convert (input_path, output_path, input_format, data) items in one /batch request.
+        
+        Returns None when the batch can't be used, so the caller converts the files one by one
+        (which also gives each file its own error message if one of them fails).
+        """
+        params = self.server_params(output_format, extra_options)
+        # Binary outputs (docx, epub, ...) come back base64 encoded per result, so they batch too
+        if params is None or not self._ensure_server():
+            return None
+        try:
+            payload = [
+                {'text': self._read_input(input_path, input_format, data), 'from': input_format, **params,
+                 **self._source_params(input_path)}
+                for input_path, _, input_format, data in items
+            ]
+            logger.info(f"Converting {len(items)} files in one pandoc server batch [output format: {output_format}]")
+            results = self._post(payload, '/batch')
+        except (UnicodeDecodeError, PandocServerError, http.client.HTTPException, OSError) as e:
+            logger.info(f"pandoc server batch not usable ({e}), converting files individually")
+            return None
+        
+        for (_, output_path, _, _), result in zip(items, results):
+            self._write_output(result, output_path)
+        return [(True, None)] * len(items)
+    
+    def _convert_with_cli(self, cmd: List[str], output_format: str,
+                          data: Optional[bytes] = None) -> Tuple[bool, Optional[str]]:
+        """Convert one file with a dedicated Pandoc subprocess, feeding in-memory uploads on stdin"""
         logger.info(f"Executing pandoc command: {' '.join(cmd[:4])} ... [output format: {output_format}]")
-        
-        # Execute pandoc command
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        # Pandoc writes to -o, so only stderr is worth a pipe; it stays bytes and is decoded on error.
+        # Python's fds are non-inheritable (PEP 446), so close_fds=False is safe and allows posix_spawn
+        subprocess.run(
+            cmd + self.rts_options, input=data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            close_fds=False, timeout=self.conversion_timeout, check=True
+        )
+        return True, None
+    
+    def convert(self, input_path: str, output_path: str, input_format: str, output_format: str,
+                extract_media_dir: Optional[str] = None,
+                extra_options: Optional[List[str]] = None,
+                data: Optional[bytes] = None) -> Tuple[bool, Optional[str]]:
+        """Run a single conversion, using the server when every option can be expressed there.
+        
+        When data is given it is the upload's content and input_path is only used for naming.
+        """
+        options = conversion_options(output_format, extra_options)
+        
+        # The server neither writes extracted media nor renders PDFs, so those stay on the CLI
+        if not extract_media_dir:
+            params = self.server_params(output_format, extra_options)
+            if params is not None and self._ensure_server():
+                try:
+                    logger.info(f"Converting {os.path.basename(input_path)} via pandoc server [output format: {output_format}]")
+                    return self._convert_with_server(input_path, output_path, input_format, params, data)
+                except UnicodeDecodeError:
+                    logger.info(f"{input_path} is not valid UTF-8, converting with the pandoc CLI instead")
+                except (http.client.HTTPException, OSError) as e:
+                    logger.warning(f"pandoc server request failed ({e}), converting with the pandoc CLI instead")
+        
+        # Without an input file argument Pandoc reads the in-memory upload from stdin; sourcefile
+        # still names the upload, which standalone writers use when a document has no title
+        if data is None:
+            cmd = [self.executable, input_path]
+        else:
+            cmd = [self.executable, f'--variable=sourcefile:{os.path.basename(input_path)}']
+        cmd.extend(['-f', input_format, '-t', output_format, '-o', output_path])
+        if extract_media_dir:
+            cmd.extend(['--extract-media', extract_media_dir])
+        cmd.extend(options)
+        return self._convert_with_cli(cmd, output_format, data)
+
+pandoc_runner = PandocRunner(use_server=PANDOC_SERVER_ENABLED)
+
+# Start the server with the worker and run one conversion through it, so the
+# first request pays neither process startup nor cold data-file loading
+if PANDOC_SERVER_ENABLED:
+    if pandoc_runner.start():
+        logger.info("pandoc server is ready for conversions")
+    else:
+        logger.warning("pandoc server unavailable, conversions will run the pandoc CLI")
+else:
+    logger.info("pandoc server disabled, conversions will run the pandoc CLI")
+pandoc_runner.warmup()
+
+class ConversionCache:
+    """On-disk cache of Pandoc outputs keyed by input content, formats and options"""
+    
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = max_bytes > 0
+    
+    def key(self, input_path: str, input_format: str, output_format: str, options: List[str],
+            data: Optional[bytes] = None) -> str:
+        """Hash the input (file or in-memory upload) together with everything that affects Pandoc's output.
+        
+        The Pandoc version is part of the key, so an upgrade doesn't serve outputs of the old release.
+        So is the upload's name: standalone writers fall back to it for an untitled document's title.
+        """
+        if data is not None:
+            digest = hashlib.sha256(data)
+        else:
+            with open(input_path, 'rb') as f:
+                if hasattr(hashlib, 'file_digest'):
+                    digest = hashlib.file_digest(f, 'sha256')
+                else:
+                    digest = hashlib.sha256()
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+        digest.update(json.dumps([
+            input_format, output_format, options, pandoc_runner.version, os.path.basename(input_path)
+        ]).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+    
+    @staticmethod
+    def _link_or_copy(src: str, dst: str) -> None:
+        # Outputs are never modified in place (see fix_image_paths_in_file), so a
+        # hardlink is safe to share; copy when the cache is on another filesystem
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise
+            shutil.copyfile(src, dst)
+    
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Link (or copy) a cached output to output_path; returns False on a miss"""
+        cache_path = self._path(key)
+        try:
+            self._link_or_copy(cache_path, output_path)
+        except FileNotFoundError:
+            return False
+        # Refresh mtime so pruning evicts least recently used entries first
+        os.utime(cache_path)
+        return True
+    
+    def store(self, key: str, output_path: str) -> None:
+        """Add a validated output; written to a temp name first so readers never see partial files"""
+        cache_path = self._path(key)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self._link_or_copy(output_path, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            remove_path(tmp_path)
+            raise
+    
+    def prune(self) -> None:
+        """Evict least recently used entries until the cache fits in max_bytes"""
+        if not self.enabled or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for entry in iter_files(self.cache_dir):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            remove_path(path)
+            total -= size
+
+conversion_cache = ConversionCache(CONVERSION_CACHE_DIR, CONVERSION_CACHE_MAX_BYTES)
+
+# Readers whose documents can carry embedded media (zip containers, data URIs, base64
+# binaries). Plain-text markup only links to images, which an upload on its own doesn't include
+MEDIA_CAPABLE_INPUTS = {'docx', 'odt', 'epub', 'pptx', 'html', 'rtf', 'fb2', 'ipynb'}
+
+# Writers that either drop images or embed them in the output container, so extracted
+# files would never be referenced and only cost disk writes
+MEDIA_EMBEDDING_OUTPUTS = {
+    'plain', 'json', 'native', 'csv', 'tsv', 'docx', 'odt', 'pptx', 'epub', 'epub2', 'epub3', 'fb2'
+}
+
+def extracts_media(input_format: str, output_format: str) -> bool:
+    """Whether a conversion should run with --extract-media"""
+    # Skipping the flag for text inputs saves Pandoc's media walk and any fetching of linked images
+    return input_format in MEDIA_CAPABLE_INPUTS and output_format not in MEDIA_EMBEDDING_OUTPUTS
+
+def is_identity_conversion(input_format: str, output_format: str, extra_options: Optional[List[str]] = None) -> bool:
+    """Whether the upload can be returned as-is instead of round-tripping it through Pandoc"""
+    if input_format != output_format or extra_options:
+        return False
+    # --standalone turns a fragment into a full document (e.g. html -> html), so Pandoc still has to run
+    return '--standalone' not in PANDOC_FORMAT_OPTIONS.get(output_format, ())
+
+def convert_file_with_pandoc(input_path, output_path, input_format, output_format, extract_media_dir, extra_options=None,
+                             data=None):
+    """Convert file using Pandoc with precise format-specific options and enhanced media handling"""
+    try:
+        if not extracts_media(input_format, output_format):
+            extract_media_dir = None
+        
+        cache_key = None
+        identity = is_identity_conversion(input_format, output_format, extra_options)
+        if conversion_cache.enabled and not identity:
+            cache_key = conversion_cache.key(
+                input_path, input_format, output_format, conversion_options(output_format, extra_options), data
+            )
+            if conversion_cache.fetch(cache_key, output_path):
+                logger.info(f"Reused cached conversion of {os.path.basename(input_path)} to {output_format}")
+                return True, None
+        
+        if identity:
+            # Already in the requested format: a Pandoc round trip would only re-wrap the text
+            logger.info(f"{os.path.basename(input_path)} is already {output_format}, copying instead of running Pandoc")
+            if data is not None:
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+            else:
+                shutil.copyfile(input_path, output_path)
+            extract_media_dir = None
+        else:
+            success, error = pandoc_runner.convert(
+                input_path, output_path, input_format, output_format, extract_media_dir, extra_options, data
+            )
+            if not success:
+                logger.error(error)
+                return False, error
         
         # Check if media was extracted
         media_files = []
-        if os.path.exists(extract_media_dir):
-            for root, dirs, files in os.walk(extract_media_dir):
-                for file in files:
-                    media_files.append(os.path.join(root, file))
+        if extract_media_dir:
+            try:
+                media_files = [entry.path for entry in iter_files(extract_media_dir)]
+            except FileNotFoundError:
+                pass  # Pandoc only creates the directory when there is media
         
         if media_files:
             logger.info(f"Extracted {len(media_files)} media files to {extract_media_dir}")
@@ -368,10 +1295,21 @@ def convert_file_with_pandoc(input_path, output_path, input_format, output_forma
         if not validation_success:
             return False, f"Conversion completed but validation failed: {validation_message}"
         
+        # Outputs that reference extracted media can't be replayed from the cache alone
+        if cache_key and not media_files:
+            try:
+                conversion_cache.store(cache_key, output_path)
+            except OSError as e:
+                logger.warning(f"Could not cache conversion of {os.path.basename(input_path)}: {e}")
+        
         return True, None
         
     except subprocess.CalledProcessError as e:
-        error_msg = f"Pandoc error: {e.stderr}"
+        error_msg = f"Pandoc error: {e.stderr.decode('utf-8', errors='replace')}"
+        logger.error(error_msg)
+        return False, error_msg
+    except subprocess.TimeoutExpired as e:
+        error_msg = f"Conversion timed out after {e.timeout} seconds"
         logger.error(error_msg)
         return False, error_msg
     except FileNotFoundError:
@@ -383,371 +1321,339 @@ def convert_file_with_pandoc(input_path, output_path, input_format, output_forma
         logger.error(error_msg)
         return False, error_msg
 
-def convert_pdf_to_markdown(pdf_path: str, output_path: str) -> Tuple[bool, Optional[str]]:
-    """Convert PDF to Markdown using PyMuPDF"""
-    if not PYMUPDF_AVAILABLE:
-        return False, "PyMuPDF is not available for PDF processing"
+def run_conversion_job(job: ConversionJob, output_format: str,
+                       extra_options: Optional[List[str]] = None) -> Tuple[bool, Optional[str]]:
+    """Convert one queued job; module level so process pool workers can unpickle it"""
+    if job.input_format in DISK_INPUT_FORMATS:
+        # PDF/PPTX text extraction runs here on the pool, not on the request thread
+        data, preprocess_result = preprocess_special_formats(job.input_path, job.input_format)
+        if data is None:
+            return False, preprocess_result
+        logger.info(f"Preprocessed {job.filename} to {len(data)} bytes of {preprocess_result}")
+        job = job._replace(input_format=preprocess_result, data=data)
+    return convert_file_with_pandoc(
+        job.input_path, job.output_path, job.input_format, output_format, job.media_dir, extra_options, job.data
+    )
+
+def run_conversion_batch(jobs: List[ConversionJob], output_format: str,
+                         extra_options: Optional[List[str]] = None) -> List[Tuple[bool, Optional[str]]]:
+    """Convert jobs that need no media extraction with a single pandoc server request.
     
+    Cached results are reused per job; if the batch can't be sent (or any document in it
+    fails) the remaining jobs go through convert_file_with_pandoc one at a time.
+    """
+    results: List[Optional[Tuple[bool, Optional[str]]]] = [None] * len(jobs)
+    cache_keys: Dict[int, str] = {}
     try:
-        doc = fitz.open(pdf_path)
-        markdown_content = []
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            
-            # Clean up the text
-            lines = text.split('\n')
-            cleaned_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if line:
-                    # Try to detect headers (simple heuristic)
-                    if len(line) < 100 and line.isupper():
-                        cleaned_lines.append(f"# {line.title()}")
-                    else:
-                        cleaned_lines.append(line)
-            
-            if cleaned_lines:
-                markdown_content.extend(cleaned_lines)
-                markdown_content.append('')  # Add blank line between pages
-        
-        doc.close()
-        
-        # Write to markdown file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(markdown_content))
+        options = conversion_options(output_format, extra_options)
+        pending = []
+        for index, job in enumerate(jobs):
+            if conversion_cache.enabled:
+                cache_keys[index] = conversion_cache.key(
+                    job.input_path, job.input_format, output_format, options, job.data
+                )
+                if conversion_cache.fetch(cache_keys[index], job.output_path):
+                    logger.info(f"Reused cached conversion of {job.filename} to {output_format}")
+                    results[index] = (True, None)
+                    continue
+            pending.append(index)
         
-        return True, None
+        batch_results = pandoc_runner.convert_batch(
+            [(jobs[i].input_path, jobs[i].output_path, jobs[i].input_format, jobs[i].data) for i in pending],
+            output_format, extra_options
+        ) if len(pending) > 1 else None
+    except Exception as e:
+        logger.warning(f"Batch conversion setup failed, converting files individually: {e}")
+        pending = [i for i, result in enumerate(results) if result is None]
+        batch_results = None
+    
+    if batch_results is None:
+        for i in pending:
+            results[i] = run_conversion_job(jobs[i], output_format, extra_options)
+        return results
+    
+    for i, (success, error) in zip(pending, batch_results):
+        job = jobs[i]
+        if success:
+            validation_success, validation_message = validate_output_file(job.output_path, output_format)
+            if not validation_success:
+                results[i] = (False, f"Conversion completed but validation failed: {validation_message}")
+                continue
+            if i in cache_keys:
+                try:
+                    conversion_cache.store(cache_keys[i], job.output_path)
+                except OSError as e:
+                    logger.warning(f"Could not cache conversion of {job.filename}: {e}")
+        results[i] = (success, error)
+    return results
+
+def init_conversion_worker():
+    """Process pool initializer: warm up a pandoc server once per worker rather than per job"""
+    if pandoc_runner.start():
+        # Pool workers leave through os._exit, skipping atexit, so hook multiprocessing's own shutdown
+        multiprocessing.util.Finalize(pandoc_runner, pandoc_runner.stop, exitpriority=10)
+        pandoc_runner.warmup()
+
+_conversion_pool = None
+_conversion_pool_lock = threading.Lock()
+
+def get_conversion_executor() -> Executor:
+    """Return the app-wide conversion pool: threads by default, worker processes with PANDOC_PROC_POOL"""
+    global _conversion_pool
+    # Created once and shared by all requests, so none of them pays for starting threads or processes
+    with _conversion_pool_lock:
+        if _conversion_pool is None:
+            if PANDOC_PROC_POOL:
+                _conversion_pool = ProcessPoolExecutor(
+                    max_workers=PANDOC_WORKERS,
+                    initializer=init_conversion_worker if PANDOC_SERVER_ENABLED else None
+                )
+            else:
+                _conversion_pool = ThreadPoolExecutor(max_workers=PANDOC_WORKERS, thread_name_prefix='pandoc')
+            atexit.register(_conversion_pool.shutdown)
+        return _conversion_pool
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Return the app-wide pool used to extract page ranges of long PDFs"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # Forking this threaded worker could hand a child a lock another thread held
+            # (logging, connections, the cleanup queue), so children come from a forkserver
+            # that has only imported pdf_extract, and never import app.py
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['pdf_extract'])
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+            atexit.register(_pdf_pool.shutdown)
+        return _pdf_pool
+
+def convert_pdf_to_markdown(pdf_path: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """Convert PDF to Markdown using PyMuPDF; returns the UTF-8 Markdown or an error message"""
+    if not PYMUPDF_AVAILABLE:
+        return None, "PyMuPDF is not available for PDF processing"
+    
+    try:
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+            if PDF_WORKERS == 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+                return pdf_pages_markdown(doc, 0, page_count), None
+        
+        # Short ranges keep workers busy when page costs are uneven (scans next to text
+        # pages); map() keeps the results in page order
+        starts = range(0, page_count, PDF_PAGES_PER_TASK)
+        stops = [min(start + PDF_PAGES_PER_TASK, page_count) for start in starts]
+        ranges = get_pdf_executor().map(pdf_page_range_markdown, itertools.repeat(pdf_path), starts, stops)
+        return b'\n\n'.join(markdown for markdown in ranges if markdown), None
         
     except Exception as e:
-        return False, f"PDF conversion error: {str(e)}"
+        return None, f"PDF conversion error: {str(e)}"
+
+# OOXML names used to read slide text straight from a .pptx package
+_PML = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_DML = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_REL_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+_TEXT_RUN_TAGS = {f'{_DML}r', f'{_DML}fld', f'{_DML}br'}
+# Uploaded XML is untrusted: never expand entities (e.g. SYSTEM "file:///etc/passwd") or
+# fetch anything over the network, as python-pptx's own parser didn't either
+_PPTX_XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True) if etree is not None else None
+
+def pptx_slide_names(pptx: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order, which slideN numbering needn't follow"""
+    presentation = etree.fromstring(pptx.read('ppt/presentation.xml'), _PPTX_XML_PARSER)
+    targets = {
+        rel.get('Id'): rel.get('Target')
+        for rel in etree.fromstring(pptx.read('ppt/_rels/presentation.xml.rels'), _PPTX_XML_PARSER)
+    }
+    names = []
+    for slide_id in presentation.iter(f'{_PML}sldId'):
+        target = targets[slide_id.get(_REL_ID)]
+        names.append(target[1:] if target.startswith('/') else posixpath.normpath(posixpath.join('ppt', target)))
+    return names
 
-def convert_pptx_to_markdown(pptx_path: str, output_path: str) -> Tuple[bool, Optional[str]]:
-    """Convert PPTX to Markdown using python-pptx"""
+def pptx_shape_texts(slide_xml: bytes) -> Iterable[str]:
+    """Text of each top-level shape on a slide, laid out like python-pptx's shape.text"""
+    shape_tree = etree.fromstring(slide_xml, _PPTX_XML_PARSER).find(f'{_PML}cSld/{_PML}spTree')
+    if shape_tree is None:
+        return
+    for shape in shape_tree.iterfind(f'{_PML}sp'):
+        body = shape.find(f'{_PML}txBody')
+        if body is None:
+            continue
+        # Paragraphs joined by newlines, line breaks inside one as vertical tabs
+        yield '\n'.join(
+            ''.join(
+                '\v' if run.tag == f'{_DML}br' else run.findtext(f'{_DML}t', '')
+                for run in paragraph if run.tag in _TEXT_RUN_TAGS
+            )
+            for paragraph in body.iterfind(f'{_DML}p')
+        )
+
+def convert_pptx_to_markdown(pptx_path: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """Convert PPTX to Markdown by reading the slide XML; returns the UTF-8 Markdown or an error message"""
     if not PPTX_AVAILABLE:
-        return False, "python-pptx is not available for PPTX processing"
+        return None, "lxml is not available for PPTX processing"
     
     try:
-        prs = Presentation(pptx_path)
         markdown_content = []
-        
-        for slide_num, slide in enumerate(prs.slides, 1):
-            # Add slide header
-            markdown_content.append(f"# Slide {slide_num}")
-            markdown_content.append('')
-            
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    text = shape.text.strip()
+        with zipfile.ZipFile(pptx_path) as pptx:
+            for slide_num, slide_name in enumerate(pptx_slide_names(pptx), 1):
+                # Add slide header
+                markdown_content.append(f"# Slide {slide_num}")
+                markdown_content.append('')
+                
+                for text in pptx_shape_texts(pptx.read(slide_name)):
+                    text = text.strip()
+                    if not text:
+                        continue
                     
                     # Try to detect if it's a title or content
                     if len(text) < 100 and text.isupper():
                         markdown_content.append(f"## {text.title()}")
                     else:
-                        # Split into paragraphs
-                        paragraphs = text.split('\n')
-                        for para in paragraphs:
-                            if para.strip():
-                                markdown_content.append(para.strip())
-                                markdown_content.append('')
-            
-            markdown_content.append('---')  # Slide separator
-            markdown_content.append('')
-        
-        # Write to markdown file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(markdown_content))
+                        # One Markdown paragraph per non-blank line of the shape's text
+                        paragraphs = filter(None, map(str.strip, text.splitlines()))
+                        markdown_content.extend(itertools.chain.from_iterable((para, '') for para in paragraphs))
+                
+                markdown_content.append('---')  # Slide separator
+                markdown_content.append('')
         
-        # Ensure the markdown file was created
-        if os.path.exists(output_path):
-            return True, None
-        else:
-            return False, "Markdown file was not created from PPTX"
+        return '\n'.join(markdown_content).encode('utf-8'), None
         
     except Exception as e:
-        return False, f"PPTX conversion error: {str(e)}"
+        return None, f"PPTX conversion error: {str(e)}"
 
-def preprocess_special_formats(input_path, input_format, temp_dir):
-    """Preprocess special formats (PDF, PPTX) to convert them to Pandoc-supported formats. PPTX and others are handled directly by Pandoc."""
+def preprocess_special_formats(input_path: str, input_format: str) -> Tuple[Optional[bytes], str]:
+    """Convert PDF/PPTX uploads to Markdown text that Pandoc reads from stdin.
+    
+    Returns (markdown, reader) on success and (None, error message) on failure.
+    """
     try:
         if input_format == 'pdf':
-            # Convert PDF to Markdown first
-            temp_md_path = os.path.join(temp_dir, 'temp_converted.md')
-            success, error = convert_pdf_to_markdown(input_path, temp_md_path)
-            if success and os.path.exists(temp_md_path):
-                return temp_md_path, 'markdown'
-            else:
-                return None, error or "PDF to Markdown conversion failed"
+            markdown, error = convert_pdf_to_markdown(input_path)
+            return (markdown, 'markdown') if markdown is not None else (None, error or "PDF to Markdown conversion failed")
         elif input_format == 'pptx':
-            # Convert PPTX to Markdown first
-            temp_md_path = os.path.join(temp_dir, 'temp_converted.md')
-            success, error = convert_pptx_to_markdown(input_path, temp_md_path)
-            if success and os.path.exists(temp_md_path):
-                return temp_md_path, 'markdown'
-            else:
-                return None, error or "PPTX to Markdown conversion failed"
+            markdown, error = convert_pptx_to_markdown(input_path)
+            return (markdown, 'markdown') if markdown is not None else (None, error or "PPTX to Markdown conversion failed")
         else:
-            # No preprocessing needed for other formats (including PPTX)
-            return input_path, input_format
+            return None, f"No preprocessing for {input_format} input"
     except Exception as e:
         return None, f"Preprocessing error: {str(e)}"
 
 def map_output_format(user_format):
     """Map user-friendly format names to actual Pandoc format names"""
-    format_mapping = {
-        'txt': 'plain',  # Pandoc uses 'plain' for plain text, not 'txt'
-        'text': 'plain',
-        'plaintext': 'plain',
-        'word': 'docx',
-        'powerpoint': 'pptx',
-        'presentation': 'pptx',
-        'document': 'docx',
-        'webpage': 'html',
-        'web': 'html',
-        'page': 'html',
-        'notebook': 'ipynb',
-        'jupyter': 'ipynb',
-        'ebook': 'epub',
-        'book': 'epub',
-        'slide': 'revealjs',
-        'slides': 'revealjs',
-        'deck': 'revealjs',
-        'beamer_slide': 'beamer',
-        'latex_slide': 'beamer',
-        'pdf_slide': 'beamer',
-        'markdown_github': 'gfm',
-        'github_markdown': 'gfm',
-        'github': 'gfm',
-        'commonmark_x': 'commonmark_x',
-        'commonmark_x_extended': 'commonmark_x',
-        'extended_commonmark': 'commonmark_x',
-        'markua': 'markua',
-        'markua_document': 'markua',
-        'spip': 'spip',
-        'spip_wiki': 'spip',
-        'epub2': 'epub2',
-        'epub_version2': 'epub2',
-        'epub3': 'epub3',
-        'epub_version3': 'epub3',
-        'docbook4': 'docbook4',
-        'docbook_version4': 'docbook4',
-        'docbook5': 'docbook5',
-        'docbook_version5': 'docbook5',
-        'jats_archiving': 'jats_archiving',
-        'jats_archiving_version': 'jats_archiving',
-        'jats_publishing': 'jats_publishing',
-        'jats_publishing_version': 'jats_publishing',
-        'jats_articleauthoring': 'jats_articleauthoring',
-        'jats_article_authoring': 'jats_articleauthoring',
-        'html5': 'html5',
-        'html_version5': 'html5',
-        'html4': 'html4',
-        'html_version4': 'html4',
-        'xhtml': 'xhtml',
-        'xhtml5': 'xhtml5',
-        'xhtml_version5': 'xhtml5',
-        'xhtml4': 'xhtml4',
-        'xhtml_version4': 'xhtml4',
-        'markdown_github': 'markdown_github',
-        'markdown_mmd': 'markdown_mmd',
-        'markdown_phpextra': 'markdown_phpextra',
-        'markdown_strict': 'markdown_strict',
-        'markdown_texinfo': 'markdown_texinfo',
-        'commonmark': 'commonmark',
-        'commonmark_strict': 'commonmark',
-        'commonmark_x': 'commonmark_x',
-        'commonmark_extended': 'commonmark_x',
-        'gfm': 'gfm',
-        'github_flavored': 'gfm',
-        'markua': 'markua',
-        'markua_document': 'markua',
-        'spip': 'spip',
-        'spip_wiki': 'spip',
-        'epub2': 'epub2',
-        'epub_version2': 'epub2',
-        'epub3': 'epub3',
-        'epub_version3': 'epub3',
-        'texinfo': 'texinfo',
-        'tex_info': 'texinfo',
-        'textile': 'textile',
-        'textile_wiki': 'textile',
-        'org': 'org',
-        'org_mode': 'org',
-        'emacs_org': 'org',
-        'asciidoc': 'asciidoc',
-        'ascii_doc': 'asciidoc',
-        'rst': 'rst',
-        'restructuredtext': 'rst',
-        'rest': 'rst',
-        'mediawiki': 'mediawiki',
-        'wiki': 'mediawiki',
-        'wikipedia': 'mediawiki',
-        'dokuwiki': 'dokuwiki',
-        'doku_wiki': 'dokuwiki',
-        'haddock': 'haddock',
-        'haskell_doc': 'haddock',
-        'opml': 'opml',
-        'outline': 'opml',
-        'fb2': 'fb2',
-        'fictionbook': 'fb2',
-        'mobi': 'mobi',
-        'kindle': 'mobi',
-        'icml': 'icml',
-        'indesign': 'icml',
-        'tei': 'tei',
-        'text_encoding_initiative': 'tei',
-        'native': 'native',
-        'pandoc_native': 'native',
-        'json': 'json',
-        'javascript_object_notation': 'json',
-        'jats_archiving': 'jats_archiving',
-        'jats_archiving_version': 'jats_archiving',
-        'jats_publishing': 'jats_publishing',
-        'jats_publishing_version': 'jats_publishing',
-        'jats_articleauthoring': 'jats_articleauthoring',
-        'jats_article_authoring': 'jats_articleauthoring',
-        'html5': 'html5',
-        'html_version5': 'html5',
-        'html4': 'html4',
-        'html_version4': 'html4',
-        'xhtml': 'xhtml',
-        'xhtml5': 'xhtml5',
-        'xhtml_version5': 'xhtml5',
-        'xhtml4': 'xhtml4',
-        'xhtml_version4': 'xhtml4',
-        'markdown_github': 'markdown_github',
-        'markdown_mmd': 'markdown_mmd',
-        'markdown_phpextra': 'markdown_phpextra',
-        'markdown_strict': 'markdown_strict',
-        'markdown_texinfo': 'markdown_texinfo',
-        'commonmark': 'commonmark',
-        'commonmark_x': 'commonmark_x',
-        'gfm': 'gfm',
-        'markua': 'markua',
-        'spip': 'txt',
-        'epub2': 'epub',
-        'epub3': 'epub',
-        'docbook4': 'xml',
-        'docbook5': 'xml',
-        'man': 'man',
-        'ms': 'ms',
-        'texinfo': 'texi',
-        'textile': 'textile',
-        'org': 'org',
-        'asciidoc': 'adoc',
-        'rst': 'rst',
-        'mediawiki': 'wiki',
-        'dokuwiki': 'txt',
-        'haddock': 'hs',
-        'opml': 'opml',
-        'fb2': 'fb2',
-        'mobi': 'mobi',
-        'icml': 'icml',
-        'tei': 'xml',
-        'native': 'native',
-        'json': 'json',
-        'jats_archiving': 'xml',
-        'jats_publishing': 'xml',
-        'jats_articleauthoring': 'xml',
-        'html5': 'html',
-        'html4': 'html',
-        'xhtml': 'xhtml',
-        'xhtml5': 'xhtml',
-        'xhtml4': 'xhtml',
-        'markdown_github': 'md',
-        'markdown_mmd': 'md',
-        'markdown_phpextra': 'md',
-        'markdown_strict': 'md',
-        'markdown_texinfo': 'texi',
-        'commonmark': 'md',
-        'commonmark_x': 'md',
-        'gfm': 'md',
-        'markua': 'md',
-        'spip': 'txt',
-        'epub2': 'epub',
-        'epub3': 'epub',
-        'texinfo': 'texi'
-    }
-    
-    # Return the mapped format or the original if no mapping exists
-    return format_mapping.get(user_format.lower(), user_format.lower())
+    user_format = user_format.lower()
+    return OUTPUT_FORMAT_ALIASES.get(user_format, user_format)
+
+# Image reference patterns per output format, compiled once, with the number of the
+# group holding the referenced path; that path is what gets rewritten to img/
+_HTML_IMAGE_SRC = (re.compile(r'src="([^"]*)"'), 1)
+_MARKDOWN_IMAGE = (re.compile(r'!\[([^\]]*)\]\(([^)]+)\)'), 2)
+IMAGE_PATH_REWRITES = {
+    'html': _HTML_IMAGE_SRC,
+    'html5': _HTML_IMAGE_SRC,
+    'xhtml': _HTML_IMAGE_SRC,
+    'markdown': _MARKDOWN_IMAGE,
+    'gfm': _MARKDOWN_IMAGE,
+    'commonmark': _MARKDOWN_IMAGE,
+    'commonmark_x': _MARKDOWN_IMAGE,
+    'rst': (re.compile(r'\.\. image:: ([^\n]+)'), 1),
+    'asciidoc': (re.compile(r'image::([^[]+)\[([^\]]*)\]'), 1),
+}
 
 def fix_image_paths_in_file(file_path: str, media_dir: str, output_format: str) -> bool:
     """Fix image paths in converted files to use relative paths to img/ folder"""
+    rewrite = IMAGE_PATH_REWRITES.get(output_format)
+    if rewrite is None:
+        return True  # No known image syntax, so the file is left untouched
+    
+    pattern, path_group = rewrite
+    tmp_path = None
     try:
-        # Read the file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Define patterns for different output formats
-        if output_format in ['html', 'html5', 'xhtml']:
-            # Fix HTML img src attributes
-            content = re.sub(
-                r'src="([^"]*)"',
-                lambda m: f'src="img/{os.path.basename(m.group(1))}"' if m.group(1) else m.group(0),
-                content
-            )
-        elif output_format in ['markdown', 'gfm', 'commonmark', 'commonmark_x']:
-            # Fix Markdown image syntax
-            content = re.sub(
-                r'!\[([^\]]*)\]\(([^)]+)\)',
-                lambda m: f'![{m.group(1)}](img/{os.path.basename(m.group(2))})',
-                content
-            )
-        elif output_format in ['rst']:
-            # Fix reStructuredText image syntax
-            content = re.sub(
-                r'\.\. image:: ([^\n]+)',
-                lambda m: f'.. image:: img/{os.path.basename(m.group(1))}',
-                content
-            )
-        elif output_format in ['asciidoc']:
-            # Fix AsciiDoc image syntax
-            content = re.sub(
-                r'image::([^[]+)\[([^\]]*)\]',
-                lambda m: f'image::img/{os.path.basename(m.group(1))}[{m.group(2)}]',
-                content
-            )
-        
-        # Write the fixed content back
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Only references to files that are in img/ are rewritten, so remote images and
+        # other links that merely look like image references keep working
+        media_names = frozenset(os.listdir(media_dir))
+        
+        def replacement(match):
+            path = match.group(path_group)
+            name = os.path.basename(path)
+            # Already img/<name> (e.g. a second pass over the file) needs no rebuilding
+            if name not in media_names or path == f"img/{name}":
+                return match.group(0)
+            start, end = match.span(path_group)
+            offset = match.start()
+            return f"{match.group(0)[:start - offset]}img/{name}{match.group(0)[end - offset:]}"
+        
+        # Stream line by line into a new inode: the output may be a hardlink into the
+        # conversion cache, which must not change with it. These formats are written with
+        # --wrap=none (HTML keeps attributes on one line), so no reference spans lines
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+        changed = False
+        with open(file_path, 'r', encoding='utf-8', newline='') as src, \
+                os.fdopen(fd, 'w', encoding='utf-8', newline='') as dst:
+            for line in src:
+                fixed_line = pattern.sub(replacement, line)
+                # A match can come back unchanged (remote image, path already img/...),
+                # so only an actual difference means the file has to be replaced
+                changed = changed or fixed_line != line
+                dst.write(fixed_line)
+        
+        if changed:
+            shutil.copymode(file_path, tmp_path)
+            os.replace(tmp_path, file_path)
+        else:
+            remove_path(tmp_path)
         
         return True
         
     except Exception as e:
+        if tmp_path:
+            remove_path(tmp_path)
         logger.error(f"Error fixing image paths in {file_path}: {str(e)}")
         return False
 
+def iter_files(base_dir: str):
+    """Recursively yield a DirEntry for every regular file below base_dir"""
+    with os.scandir(base_dir) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
 def organize_media_files(media_dir: str, img_dir: str) -> List[str]:
     """Organize extracted media files into img/ folder and return list of moved files"""
     moved_files = []
     
     try:
-        # Create img directory if it doesn't exist
-        os.makedirs(img_dir, exist_ok=True)
-        
         # Move all media files to img/ folder
         if os.path.exists(media_dir):
-            for root, dirs, files in os.walk(media_dir):
-                for file in files:
-                    src_path = os.path.join(root, file)
-                    dst_path = os.path.join(img_dir, file)
-                    
-                    # Handle duplicate filenames
-                    counter = 1
-                    base_name, ext = os.path.splitext(file)
-                    while os.path.exists(dst_path):
-                        new_name = f"{base_name}_{counter}{ext}"
-                        dst_path = os.path.join(img_dir, new_name)
-                        counter += 1
-                    
-                    # Move the file
-                    shutil.move(src_path, dst_path)
-                    moved_files.append(dst_path)
-                    logger.info(f"Moved media file: {file} -> img/{os.path.basename(dst_path)}")
+            # Materialize the listing first since files are moved out while iterating
+            for entry in list(iter_files(media_dir)):
+                if not moved_files:
+                    # Created with the first file, so text-only sessions get no empty img/
+                    os.makedirs(img_dir, exist_ok=True)
+                file = entry.name
+                dst_path = os.path.join(img_dir, file)
+                
+                # Handle duplicate filenames
+                counter = 1
+                base_name, ext = os.path.splitext(file)
+                while os.path.exists(dst_path):
+                    new_name = f"{base_name}_{counter}{ext}"
+                    dst_path = os.path.join(img_dir, new_name)
+                    counter += 1
+                
+                # Media and img/ share the session directory, so a rename is one syscall;
+                # shutil.move's stat/copy fallback is only needed across filesystems
+                try:
+                    os.rename(entry.path, dst_path)
+                except OSError:
+                    shutil.move(entry.path, dst_path)
+                moved_files.append(dst_path)
+                logger.info(f"Moved media file: {file} -> img/{os.path.basename(dst_path)}")
         
         return moved_files
         
@@ -755,294 +1661,527 @@ def organize_media_files(media_dir: str, img_dir: str) -> List[str]:
         logger.error(f"Error organizing media files: {str(e)}")
         return moved_files
 
+class ZipStreamSink(io.RawIOBase):
+    """Unseekable write-only buffer that lets ZipFile output be yielded as it is produced"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last call"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def readahead(file_path: str) -> None:
+    """Ask the kernel to start pulling a file into the page cache in the background"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+def zip_info_for(arcname: str, st: os.stat_result) -> zipfile.ZipInfo:
+    """Build an entry header from an already open file's stat, instead of ZipInfo.from_file's extra stat by path"""
+    date_time = time.localtime(st.st_mtime)[:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    zip_info = zipfile.ZipInfo(arcname, date_time)
+    zip_info.external_attr = (st.st_mode & 0xFFFF) << 16
+    zip_info.file_size = st.st_size
+    if arcname.rpartition('.')[2].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        zip_info.compress_type = zipfile.ZIP_STORED
+    else:
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        # ZipFile.open() doesn't apply the archive's compresslevel to a caller-built ZipInfo
+        zip_info._compresslevel = ZIP_COMPRESSLEVEL
+    return zip_info
+
+def stream_zip(entries: Iterable[Tuple[str, str]], chunk_size: int = 1024 * 1024):
+    """Yield a ZIP archive of (file_path, arcname) entries chunk by chunk, without writing it to disk.
+    
+    entries may be a generator that produces files while the archive is being streamed.
+    """
+    sink = ZipStreamSink()
+    try:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as zipf:
+            for file_path, arcname in entries:
+                with open(file_path, 'rb') as src:
+                    zip_info = zip_info_for(arcname, os.fstat(src.fileno()))
+                    with zipf.open(zip_info, 'w') as dest:
+                        while True:
+                            chunk = src.read(chunk_size)
+                            if not chunk:
+                                break
+                            dest.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                logger.info(f"Added file to ZIP: {arcname}")
+        yield sink.drain()
+    except Exception as e:
+        # Headers are already sent, so the client only sees a truncated archive
+        logger.error(f"Error streaming ZIP: {str(e)}")
+        raise
+
+def send_archive(zip_path: str) -> Response:
+    """Respond with a result archive in OUTPUT_FOLDER, letting nginx send it when configured"""
+    zip_filename = os.path.basename(zip_path)
+    if X_ACCEL_REDIRECT_PREFIX:
+        # nginx replaces the empty body with the file, so no worker time is spent on the download
+        response = Response(mimetype='application/zip')
+        response.headers['X-Accel-Redirect'] = f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{zip_filename}"
+        response.headers['Content-Disposition'] = f'attachment; filename={zip_filename}'
+        return response
+    # With USE_X_SENDFILE, send_file only emits headers (including Content-Length)
+    return send_file(zip_path, as_attachment=True, download_name=zip_filename, mimetype='application/zip')
+
+def async_job_status_path(job_id: str) -> str:
+    return os.path.join(ASYNC_JOBS_DIR, f"{job_id}.json")
+
+def async_job_archive_path(job_id: str) -> str:
+    return os.path.join(OUTPUT_FOLDER, f"converted_files_{job_id}.zip")
+
+def write_async_job_status(job_id: str, status: Dict[str, Any]) -> None:
+    """Atomically replace a job's status file so pollers never read a partial one"""
+    os.makedirs(ASYNC_JOBS_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=ASYNC_JOBS_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, async_job_status_path(job_id))
+
+def read_async_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return a job's status, or None for an unknown (or expired) job id"""
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        return None
+    try:
+        with open(async_job_status_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def run_async_job(job_id: str, zip_entries, file_count: int, converted_files: List[str],
+                  conversion_errors: List[str], finish: Any) -> None:
+    """Background half of an async=1 request: write the archive where /result can serve it"""
+    zip_path = async_job_archive_path(job_id)
+    try:
+        with open(f"{zip_path}.part", 'wb') as f:
+            # The running status is written once; touching it keeps sweep_stale_archives from
+            # expiring the job while a long batch is still converting
+            next_refresh = time.monotonic() + CLEANUP_SWEEP_INTERVAL
+            for chunk in stream_zip(zip_entries):
+                f.write(chunk)
+                if time.monotonic() >= next_refresh:
+                    os.utime(async_job_status_path(job_id))
+                    next_refresh = time.monotonic() + CLEANUP_SWEEP_INTERVAL
+        if converted_files:
+            os.replace(f"{zip_path}.part", zip_path)
+            status = 'done'
+        else:
+            remove_path(f"{zip_path}.part")
+            status = 'failed'
+        write_async_job_status(job_id, {
+            'status': status, 'files': file_count, 'converted_files': converted_files, 'errors': conversion_errors
+        })
+    except Exception as e:
+        logger.error(f"Async conversion {job_id} failed: {str(e)}")
+        remove_path(f"{zip_path}.part")
+        write_async_job_status(job_id, {
+            'status': 'failed', 'files': file_count, 'converted_files': [],
+            'errors': conversion_errors + [f'Server error: {str(e)}']
+        })
+    finally:
+        finish()
+
 @app.route('/convert', methods=['POST'])
-def convert_files():
+@app.route('/retry', methods=['POST'])
+def convert_files(files: Optional[List[FileStorage]] = None, form: Optional[MultiDict] = None):
+    """Convert uploaded files; /retry is the same view, used to re-run a failed conversion.
+    
+    /convert-raw passes its single upload and query parameters in as files and form.
+    """
+    session_dir = None
+    futures = {}
+    for_retry = ' for retry' if request.path == '/retry' else ''
+    form = request.form if form is None else form
     try:
-        if 'files' not in request.files:
-            return jsonify({'error': 'No files provided'}), 400
+        if files is None:
+            if 'files' not in request.files:
+                return jsonify({'error': f'No files provided{for_retry}'}), 400
+            files = request.files.getlist('files')
         
-        files = request.files.getlist('files')
-        original_output_format = request.form.get('output_format', 'pdf')
+        original_output_format = form.get('output_format', 'pdf')
         output_format = original_output_format.strip().lower()
         
         if not files or all(file.filename == '' for file in files):
-            return jsonify({'error': 'No files selected'}), 400
+            return jsonify({'error': f'No files selected{for_retry}'}), 400
         
         # Validate output format
         if not output_format or output_format.strip() == '':
-            return jsonify({'error': 'Output format is required'}), 400
+            return jsonify({'error': f'Output format is required{for_retry}'}), 400
         
         # Map user-friendly format names to actual Pandoc format names
         output_format = map_output_format(output_format)
         
-        logger.info(f"User requested format: {original_output_format}, mapped to: {output_format}")
+        logger.info("User requested format: %s, mapped to: %s", original_output_format, output_format)
+        if for_retry:
+            logger.info("Retry conversion requested for %s files to %s", len(files), output_format)
+        
+        # .md uploads are read as commonmark_x; callers relying on Pandoc markdown extensions
+        # can choose the reader with the optional markdown_reader field
+        markdown_reader = form.get('markdown_reader', '').strip().lower()
+        if markdown_reader and markdown_reader not in MARKDOWN_READERS:
+            return jsonify({
+                'error': f"Unsupported markdown_reader '{markdown_reader}'",
+                'supported_readers': sorted(MARKDOWN_READERS)
+            }), 400
+        
+        # async=1 returns a job id right away; the archive is then fetched from /result/<job_id>
+        run_async = form.get('async') == '1'
+        
+        # Inlining images/CSS into HTML can fetch remote resources, so it is opt-in per request
+        extra_options = [pandoc_runner.embed_resources_option] if form.get('embed_resources') == '1' else []
+        # standalone=0 asks for a bare fragment (e.g. HTML body only) instead of a full document
+        if form.get('standalone') == '0' and '--standalone' in PANDOC_FORMAT_OPTIONS.get(output_format, ()):
+            extra_options.append(NO_STANDALONE)
         
         # Create unique session directory
         session_id = str(uuid.uuid4())
-        session_dir = os.path.join(OUTPUT_FOLDER, session_id)
-        os.makedirs(session_dir, exist_ok=True)
+        session_dir = tempfile.mkdtemp(prefix=f"{session_id}-", dir=SESSION_ROOT)
         
-        # Create subdirectories
+        # Only uploads/ and converted/ must exist up front: Pandoc creates the media
+        # directories itself and organize_media_files creates img/ when there is media
         uploads_dir = os.path.join(session_dir, 'uploads')
         converted_dir = os.path.join(session_dir, 'converted')
         media_dir = os.path.join(session_dir, 'media')
         img_dir = os.path.join(session_dir, 'img')  # New img directory for organized images
         
-        os.makedirs(uploads_dir, exist_ok=True)
-        os.makedirs(converted_dir, exist_ok=True)
-        os.makedirs(media_dir, exist_ok=True)
-        os.makedirs(img_dir, exist_ok=True)
+        # mkdtemp just created the parent, so a bare mkdir is one syscall each with
+        # none of makedirs' path splitting and existence checks
+        os.mkdir(uploads_dir)
+        os.mkdir(converted_dir)
+        
+        # Per-file paths are built by concatenating onto these rather than os.path.join
+        uploads_prefix = uploads_dir + os.sep
+        converted_prefix = converted_dir + os.sep
+        media_prefix = media_dir + os.sep
         
         conversion_errors = []
         converted_files = []
+        jobs = []
+        
+        # Get extension for the output format (the same for every file in the request)
+        if output_format is None:
+            output_extension = 'txt'  # Default fallback
+        else:
+            output_extension = FORMAT_EXTENSIONS.get(output_format, output_format)
         
+        # Save and preprocess uploads first, queueing one conversion job per file
+        used_base_names = set()
         for file in files:
-            if file and file.filename and allowed_file(file.filename):
-                # Save uploaded file
-                filename = secure_filename(file.filename)
-                input_path = os.path.join(uploads_dir, filename)
-                file.save(input_path)
-                logger.info(f"Saved uploaded file to: {input_path} (exists: {os.path.exists(input_path)})")
-                
-                # Determine input format
-                input_format = get_input_format(filename)
-                logger.info(f"Detected input format for {filename}: {input_format}")
-                
-                # Preprocess special formats (PDF, PPTX) if needed
-                processed_input_path, processed_input_format = preprocess_special_formats(
-                    input_path, input_format, uploads_dir
-                )
-                logger.info(f"Processed input path: {processed_input_path} (exists: {os.path.exists(processed_input_path) if processed_input_path else 'N/A'})")
-                
-                if processed_input_path is None:
-                    logger.error(f"Failed to preprocess {filename}: {processed_input_format}")
-                    conversion_errors.append(f"{filename}: {processed_input_format}")
-                    continue
+            parsed_name = parse_upload_filename(file.filename) if file and file.filename else None
+            if parsed_name:
+                filename, base_name, ext, input_format = parsed_name
+                if markdown_reader and input_format == INPUT_FORMAT_MAPPING['md']:
+                    input_format = markdown_reader
                 
-                # Check if processed input file exists before Pandoc call
-                if not os.path.exists(processed_input_path):
-                    logger.error(f"File does not exist before Pandoc call: {processed_input_path}")
-                    conversion_errors.append(f"{filename}: Input file missing before Pandoc call")
+                # A mislabelled binary upload (a PDF named .txt) would only fail inside Pandoc
+                sniffed_format = sniff_input_format(peek_upload(file), input_format)
+                if sniffed_format == 'zip':
+                    logger.error("Rejected %s: ZIP archive uploaded as %s", filename, ext)
+                    conversion_errors.append(f"{filename}: File is a ZIP archive, not a {ext} file")
                     continue
-                else:
-                    logger.info(f"File confirmed to exist before Pandoc call: {processed_input_path}")
-                    logger.info(f"Current working directory: {os.getcwd()}")
+                if sniffed_format:
+                    logger.warning("%s content is %s, not %s; converting it as %s",
+                                   filename, sniffed_format, input_format, sniffed_format)
+                    input_format = sniffed_format
                 
-                # Generate output filename
-                base_name = os.path.splitext(filename)[0]
+                # Files are now converted concurrently, so two uploads sharing a base name
+                # (a.md and a.txt, or the same name twice) must not write the same paths
+                if base_name in used_base_names:
+                    counter = 1
+                    while f"{base_name}_{counter}" in used_base_names:
+                        counter += 1
+                    base_name = f"{base_name}_{counter}"
+                    filename = f"{base_name}.{ext}"
+                used_base_names.add(base_name)
                 
-                # Define common format extensions
-                format_extensions = {
-                    'gfm': 'md',
-                    'markdown': 'md',
-                    'html': 'html',
-                    'latex': 'tex',
-                    'pdf': 'pdf',
-                    'docx': 'docx',
-                    'odt': 'odt',
-                    'rtf': 'rtf',
-                    'epub': 'epub',
-                    'pptx': 'pptx',
-                    'xml': 'xml',
-                    'txt': 'txt',
-                    'plain': 'txt',
-                    'docbook': 'xml',
-                    'jats': 'xml',
-                    'opendocument': 'odt',
-                    'revealjs': 'html',
-                    'beamer': 'pdf',
-                    's5': 'html',
-                    'slideous': 'html',
-                    'dzslides': 'html',
-                    'slidy': 'html',
-                    'asciidoc': 'adoc',
-                    'rst': 'rst',
-                    'org': 'org',
-                    'textile': 'textile',
-                    'mediawiki': 'wiki',
-                    'dokuwiki': 'txt',
-                    'haddock': 'hs',
-                    'man': 'man',
-                    'ms': 'ms',
-                    'opml': 'opml',
-                    'fb2': 'fb2',
-                    'mobi': 'mobi',
-                    'icml': 'icml',
-                    'tei': 'xml',
-                    'native': 'native',
-                    'json': 'json',
-                    'docbook5': 'xml',
-                    'docbook4': 'xml',
-                    'jats_archiving': 'xml',
-                    'jats_publishing': 'xml',
-                    'jats_articleauthoring': 'xml',
-                    'html5': 'html',
-                    'html4': 'html',
-                    'xhtml': 'xhtml',
-                    'xhtml5': 'xhtml',
-                    'xhtml4': 'xhtml',
-                    'markdown_github': 'md',
-                    'markdown_mmd': 'md',
-                    'markdown_phpextra': 'md',
-                    'markdown_strict': 'md',
-                    'markdown_texinfo': 'texi',
-                    'commonmark': 'md',
-                    'commonmark_x': 'md',
-                    'gfm': 'md',
-                    'markua': 'md',
-                    'spip': 'txt',
-                    'epub2': 'epub',
-                    'epub3': 'epub',
-                    'docbook4': 'xml',
-                    'docbook5': 'xml',
-                    'man': 'man',
-                    'ms': 'ms',
-                    'texinfo': 'texi',
-                    'textile': 'textile',
-                    'org': 'org',
-                    'asciidoc': 'adoc',
-                    'rst': 'rst',
-                    'mediawiki': 'wiki',
-                    'dokuwiki': 'txt',
-                    'haddock': 'hs',
-                    'opml': 'opml',
-                    'fb2': 'fb2',
-                    'mobi': 'mobi',
-                    'icml': 'icml',
-                    'tei': 'xml',
-                    'native': 'native',
-                    'json': 'json',
-                    'jats_archiving': 'xml',
-                    'jats_publishing': 'xml',
-                    'jats_articleauthoring': 'xml',
-                    'html5': 'html',
-                    'html4': 'html',
-                    'xhtml': 'xhtml',
-                    'xhtml5': 'xhtml',
-                    'xhtml4': 'xhtml',
-                    'markdown_github': 'md',
-                    'markdown_mmd': 'md',
-                    'markdown_phpextra': 'md',
-                    'markdown_strict': 'md',
-                    'markdown_texinfo': 'texi',
-                    'commonmark': 'md',
-                    'commonmark_x': 'md',
-                    'gfm': 'md',
-                    'markua': 'md',
-                    'spip': 'txt',
-                    'epub2': 'epub',
-                    'epub3': 'epub',
-                    'texinfo': 'texi'
-                }
+                # Small uploads stay in memory and go to Pandoc without touching disk
+                input_path = uploads_prefix + filename
+                data = None
+                if input_format not in DISK_INPUT_FORMATS:
+                    data = read_small_upload(file, SMALL_UPLOAD_BYTES)
                 
-                # Get extension for the output format
-                if output_format is None:
-                    extension = 'txt'  # Default fallback
+                if data is not None:
+                    logger.info("Keeping %s in memory (%s bytes), detected input format: %s", filename, len(data), input_format)
                 else:
-                    extension = format_extensions.get(output_format, output_format)
-                output_filename = f"{base_name}.{extension}"
+                    # save_upload raises if the file can't be written, so no existence check follows
+                    save_upload(file, input_path)
+                    logger.info("Saved uploaded file to: %s, detected input format: %s", input_path, input_format)
                 
-                output_path = os.path.join(converted_dir, output_filename)
+                output_filename = f"{base_name}.{output_extension}"
                 
-                # Convert file
-                logger.info(f"Converting {filename} from {input_format} to {output_format}")
-                success, error = convert_file_with_pandoc(
-                    processed_input_path, output_path, processed_input_format, output_format, media_dir
-                )
+                output_path = converted_prefix + output_filename
                 
-                if success:
-                    # Organize media files into img/ folder
-                    moved_media_files = organize_media_files(media_dir, img_dir)
-                    
-                    # Fix image paths in the converted file if it's a text-based format
-                    text_based_formats = ['html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 
-                                         'commonmark_x', 'rst', 'asciidoc', 'textile', 'mediawiki', 
-                                         'dokuwiki', 'org', 'opml', 'fb2', 'mobi', 'docbook', 
-                                         'docbook4', 'docbook5', 'jats', 'tei', 'icml']
-                    
-                    if output_format in text_based_formats and moved_media_files:
-                        fix_image_paths_in_file(output_path, img_dir, output_format)
-                        logger.info(f"Fixed image paths in {output_filename}")
-                    
-                    logger.info(f"Successfully converted {filename} to {output_filename} and validated output")
-                    converted_files.append(output_filename)
-                else:
-                    logger.error(f"Failed to convert {filename}: {error}")
-                    conversion_errors.append(f"{filename}: {error}")
+                logger.info("Queued %s for conversion from %s to %s", filename, input_format, output_format)
+                jobs.append(ConversionJob(
+                    filename=filename,
+                    input_path=input_path,
+                    input_format=input_format,
+                    output_filename=output_filename,
+                    output_path=output_path,
+                    # Separate extraction directory per file so concurrent Pandoc runs don't collide
+                    media_dir=f"{media_prefix}{len(jobs)}",
+                    data=data
+                ))
             else:
                 conversion_errors.append(f"Invalid file type: {file.filename}")
         
-        if not converted_files:
+        # With more documents than workers, the ones that need no media extraction or
+        # preprocessing are grouped so each worker sends one pandoc server batch instead
+        # of a request per file
+        batchable, single_jobs = [], []
+        for job in jobs:
+            if not is_identity_conversion(job.input_format, output_format, extra_options) \
+                    and not extracts_media(job.input_format, output_format) \
+                    and job.input_format not in DISK_INPUT_FORMATS:
+                batchable.append(job)
+            else:
+                single_jobs.append(job)
+        if len(batchable) <= PANDOC_WORKERS:
+            single_jobs, batchable = jobs, []
+        batches = [batchable[i::PANDOC_WORKERS] for i in range(PANDOC_WORKERS)] if batchable else []
+        
+        # Convert all saved files concurrently on the shared pool; Pandoc runs in its own
+        # process so threads suffice unless PANDOC_PROC_POOL asks for worker processes
+        executor = get_conversion_executor()
+        futures = {
+            executor.submit(run_conversion_batch, batch, output_format, extra_options): batch
+            for batch in batches
+        }
+        futures.update({
+            executor.submit(run_conversion_job, job, output_format, extra_options): job
+            for job in single_jobs
+        })
+        
+        def finish_conversions():
+            """Cancel this request's queued conversions and wait for the running ones"""
+            for future in futures:
+                future.cancel()
+            wait(futures)
+        
+        # Preserve img/ directory structure in ZIP; slicing skips relpath's normalization
+        prefix_len = len(session_dir) + 1
+        
+        def completed_entries():
+            """Yield (file_path, arcname) archive entries as conversions finish: each converted file, then its media"""
+            media_count = 0
+            for future in as_completed(futures):
+                submitted = futures[future]
+                if isinstance(submitted, ConversionJob):
+                    job_results = [(submitted, future.result())]
+                else:
+                    job_results = zip(submitted, future.result())
+                
+                for job, (success, error) in job_results:
+                    if success:
+                        # Organize media files into img/ folder
+                        moved_media_files = organize_media_files(job.media_dir, img_dir)
+                        
+                        # Fix image paths in the converted file if its format has a known image syntax
+                        if output_format in IMAGE_PATH_REWRITES and moved_media_files:
+                            fix_image_paths_in_file(job.output_path, img_dir, output_format)
+                            logger.info("Fixed image paths in %s", job.output_filename)
+                        
+                        logger.info("Successfully converted %s to %s and validated output", job.filename, job.output_filename)
+                        converted_files.append(job.output_filename)
+                        # This job's files are archived next; start their disk reads now so the
+                        # media are being read in while the converted file is compressed
+                        for file_path in itertools.chain([job.output_path], moved_media_files):
+                            readahead(file_path)
+                        yield job.output_path, job.output_filename
+                        for media_path in moved_media_files:
+                            yield media_path, media_path[prefix_len:]
+                        media_count += len(moved_media_files)
+                    else:
+                        logger.error("Failed to convert %s: %s", job.filename, error)
+                        conversion_errors.append(f"{job.filename}: {error}")
+            
+            logger.info("Archived %s converted files and %s image files", len(converted_files), media_count)
+            # Clean up uploaded files (keep converted files for the streamed download)
+            schedule_cleanup(uploads_dir)
+        
+        zip_entries = completed_entries()
+        
+        if run_async and jobs:
+            def finish_async():
+                finish_conversions()
+                schedule_cleanup(session_dir)
+            
+            # The session id doubles as the job id; the request thread is free once jobs are queued
+            write_async_job_status(session_id, {
+                'status': 'running', 'files': len(jobs), 'converted_files': [], 'errors': conversion_errors
+            })
+            threading.Thread(
+                target=run_async_job, name=f'async-{session_id}', daemon=True,
+                args=(session_id, zip_entries, len(jobs), converted_files, conversion_errors, finish_async)
+            ).start()
+            logger.info("Queued async conversion %s of %s files to %s", session_id, len(jobs), output_format)
+            return jsonify({
+                'job_id': session_id,
+                'status_url': f'/status/{session_id}',
+                'result_url': f'/result/{session_id}'
+            }), 202
+        
+        # Wait only for the first successful conversion: a failed request still gets a JSON
+        # error, while the archive can start downloading before the remaining files finish
+        try:
+            first_entry = next(zip_entries, None)
+        except BaseException:
+            finish_conversions()
+            raise
+        
+        if first_entry is None:
+            finish_conversions()
             error_msg = "No files were successfully converted."
             if conversion_errors:
                 error_msg += " Errors: " + "; ".join(conversion_errors)
+            schedule_cleanup(session_dir)
             return jsonify({'error': error_msg}), 400
         
-        # Create ZIP file
         zip_filename = f"converted_files_{session_id}.zip"
-        zip_path = os.path.join(session_dir, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add converted files
-            converted_count = 0
-            for filename in os.listdir(converted_dir):
-                file_path = os.path.join(converted_dir, filename)
-                zipf.write(file_path, filename)
-                converted_count += 1
-                logger.info(f"Added converted file to ZIP: {filename}")
-            
-            # Add img folder with organized media files
-            img_count = 0
-            if os.path.exists(img_dir) and os.listdir(img_dir):
-                for root, dirs, files in os.walk(img_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Preserve img/ directory structure in ZIP
-                        arcname = os.path.relpath(file_path, session_dir)
-                        zipf.write(file_path, arcname)
-                        img_count += 1
-                        logger.info(f"Added image file to ZIP: {arcname}")
-            
-            logger.info(f"ZIP created with {converted_count} converted files and {img_count} image files")
-        
-        # Clean up uploaded files (keep converted and zip for download)
-        shutil.rmtree(uploads_dir, ignore_errors=True)
+        zip_entries = itertools.chain([first_entry], zip_entries)
+        logger.info("Streaming ZIP as conversions finish, starting with %s", first_entry[1])
         
-        # Return ZIP file
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
+        if app.config['USE_X_SENDFILE'] or X_ACCEL_REDIRECT_PREFIX:
+            # The front-end server needs a real file, so write the archive once where it can
+            # read it; the response then only carries headers
+            zip_path = os.path.join(OUTPUT_FOLDER, zip_filename)
+            try:
+                with open(zip_path, 'wb') as f:
+                    for chunk in stream_zip(zip_entries):
+                        f.write(chunk)
+            finally:
+                finish_conversions()
+            schedule_cleanup(session_dir)
+            return send_archive(zip_path)
+        
+        def finish_download():
+            # Conversions still running for an aborted download are cancelled or
+            # waited for before the session directory they write into is removed
+            finish_conversions()
+            schedule_cleanup(session_dir)
+        
+        # Stream the ZIP straight to the client instead of building it on disk first
+        response = Response(
+            stream_zip(zip_entries),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={zip_filename}'}
         )
+        # The converted files are only needed until the download finishes
+        response.call_on_close(finish_download)
+        return response
         
     except Exception as e:
+        # Conversions already queued write into the session directory, so they are
+        # cancelled or waited for before it is scheduled for removal
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        if session_dir:
+            schedule_cleanup(session_dir)
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/convert-raw', methods=['POST'])
+def convert_raw():
+    """Convert a single file sent as the raw request body, skipping multipart parsing.
+    
+    The filename comes from the X-Filename header (or ?filename=); /convert's form
+    fields such as output_format are taken from the query string.
+    """
+    filename = request.headers.get('X-Filename') or request.args.get('filename', '')
+    if not filename:
+        return jsonify({'error': 'X-Filename header or filename parameter is required'}), 400
+    
+    # Same spooling rule as multipart uploads, but one buffered copy with no parser in the way
+    if (request.content_length or 0) > UploadRequest.SPOOL_TO_DISK_BYTES:
+        stream = tempfile.NamedTemporaryFile('wb+', prefix='spool-', dir=SESSION_ROOT)
+        shutil.copyfileobj(request.stream, stream, 1024 * 1024)
+        stream.seek(0)
+    else:
+        stream = io.BytesIO(request.stream.read())
+    
+    upload = FileStorage(stream=stream, filename=filename)
+    try:
+        return convert_files(files=[upload], form=request.args)
+    finally:
+        # Conversion works on saved or in-memory copies, so the spool can go now
+        stream.close()
+
+@app.route('/status/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Report the progress of an async conversion"""
+    status = read_async_job_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired job id'}), 404
+    return jsonify({'job_id': job_id, **status}), 200
+
+@app.route('/result/<job_id>', methods=['GET'])
+def get_job_result(job_id):
+    """Download the archive of a finished async conversion"""
+    status = read_async_job_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired job id'}), 404
+    if status['status'] == 'running':
+        return jsonify({'job_id': job_id, **status}), 202
+    if status['status'] != 'done':
+        error_msg = "No files were successfully converted."
+        if status['errors']:
+            error_msg += " Errors: " + "; ".join(status['errors'])
+        return jsonify({'error': error_msg}), 400
+    return send_archive(async_job_archive_path(job_id))
+
+def _pandoc_format_list(option: str) -> List[str]:
+    result = subprocess.run([pandoc_runner.executable, option], capture_output=True, text=True, timeout=10)
+    return result.stdout.strip().split('\n') if result.returncode == 0 else []
+
+@functools.lru_cache(maxsize=1)
+def _pandoc_capabilities() -> Dict[str, Any]:
+    # Static for the life of the worker; a failed probe raises, so it isn't cached
+    if not pandoc_runner.version:
+        raise RuntimeError('Pandoc not available')
+    return {
+        'pandoc_version': pandoc_runner.version,
+        'input_formats': _pandoc_format_list('--list-input-formats'),
+        'output_formats': _pandoc_format_list('--list-output-formats'),
+    }
+
 @app.route('/test', methods=['GET'])
 def test_conversion():
     """Test endpoint to verify Pandoc is working and check supported formats"""
     try:
-        # Test Pandoc availability
-        result = subprocess.run(['pandoc', '--version'], capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            pandoc_version = result.stdout.split('\n')[0]
-        else:
+        # Test Pandoc availability and supported formats
+        try:
+            capabilities = _pandoc_capabilities()
+        except RuntimeError:
             return jsonify({'error': 'Pandoc not available'}), 500
         
-        # Test supported formats
-        result = subprocess.run(['pandoc', '--list-input-formats'], capture_output=True, text=True, timeout=10)
-        input_formats = result.stdout.strip().split('\n') if result.returncode == 0 else []
-        
-        result = subprocess.run(['pandoc', '--list-output-formats'], capture_output=True, text=True, timeout=10)
-        output_formats = result.stdout.strip().split('\n') if result.returncode == 0 else []
-        
-        return jsonify({
-            'pandoc_version': pandoc_version,
-            'input_formats': input_formats,
-            'output_formats': output_formats,
-            'status': 'Pandoc is working correctly'
-        }), 200
+        return jsonify({**capabilities, 'status': 'Pandoc is working correctly'}), 200
         
     except Exception as e:
         return jsonify({'error': f'Test failed: {str(e)}'}), 500
@@ -1051,244 +2190,86 @@ def test_conversion():
 def health_check():
     return "OK", 200
 
-@app.route('/retry', methods=['POST'])
-def retry_conversion():
-    """Retry a failed conversion with the same parameters"""
-    try:
-        if 'files' not in request.files:
-            return jsonify({'error': 'No files provided for retry'}), 400
-        
-        files = request.files.getlist('files')
-        original_output_format = request.form.get('output_format', 'pdf')
-        output_format = original_output_format.strip().lower()
-        
-        if not files or all(file.filename == '' for file in files):
-            return jsonify({'error': 'No files selected for retry'}), 400
-        
-        # Validate output format
-        if not output_format or output_format.strip() == '':
-            return jsonify({'error': 'Output format is required for retry'}), 400
-        
-        # Map user-friendly format names to actual Pandoc format names
-        output_format = map_output_format(output_format)
-        
-        logger.info(f"User requested format: {original_output_format}, mapped to: {output_format}")
-        
-        # Log retry attempt
-        logger.info(f"Retry conversion requested for {len(files)} files to {output_format}")
-        
-        # Use the same conversion logic as /convert
-        return convert_files()
-        
-    except Exception as e:
-        logger.error(f"Retry conversion error: {str(e)}")
-        return jsonify({'error': f'Retry failed: {str(e)}'}), 500
-
 @app.route('/')
 def index():
     return "Backend server is running. Use /convert, /retry, or /health endpoints."
 
-def get_supported_output_formats(input_formats):
-    """Get list of supported output formats for given input formats"""
+# Output formats shared by nearly every input; the table below is built from these
+COMMON_OUTPUT_FORMATS = frozenset({
+    'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
+    'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
+    'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
+    'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
+    'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst'
+})
+DOCUMENT_OUTPUT_FORMATS = COMMON_OUTPUT_FORMATS | {'docx', 'odt'}
+SLIDE_OUTPUT_FORMATS = frozenset({'revealjs', 'beamer', 's5', 'slideous', 'dzslides', 'slidy'})
+
+# Maps each input format to the output formats it converts to; converting a
+# format to itself is not offered
+FORMAT_COMPATIBILITY = {
+    # Document formats
+    'docx': COMMON_OUTPUT_FORMATS | {'opendocument'},
+    'doc': COMMON_OUTPUT_FORMATS | {'opendocument'},
+    'odt': COMMON_OUTPUT_FORMATS | {'docx'},
+    'rtf': DOCUMENT_OUTPUT_FORMATS - {'rtf'},
     
-    # Define format compatibility matrix
-    # This maps input formats to their supported output formats
-    format_compatibility = {
-        # Document formats
-        'docx': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'opendocument'
-        ],
-        'doc': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'opendocument'
-        ],
-        'odt': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx'
-        ],
-        'rtf': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        
-        # Presentation formats
-        'pptx': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'revealjs',
-            'beamer', 's5', 'slideous', 'dzslides', 'slidy'
-        ],
-        
-        # Web formats
-        'html': [
-            'markdown', 'gfm', 'commonmark', 'commonmark_x', 'pdf', 'latex',
-            'docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'epub', 'epub2',
-            'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain', 'json', 'native',
-            'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki', 'haddock',
-            'man', 'ms', 'asciidoc', 'rst', 'html5', 'xhtml', 'docx', 'odt'
-        ],
-        'htm': [
-            'markdown', 'gfm', 'commonmark', 'commonmark_x', 'pdf', 'latex',
-            'docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'epub', 'epub2',
-            'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain', 'json', 'native',
-            'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki', 'haddock',
-            'man', 'ms', 'asciidoc', 'rst', 'html5', 'xhtml', 'docx', 'odt'
-        ],
-        
-        # Markup formats
-        'markdown': [
-            'html', 'html5', 'xhtml', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt',
-            'revealjs', 'beamer', 's5', 'slideous', 'dzslides', 'slidy'
-        ],
-        'md': [
-            'html', 'html5', 'xhtml', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt',
-            'revealjs', 'beamer', 's5', 'slideous', 'dzslides', 'slidy'
-        ],
-        
-        # PDF (limited support)
-        'pdf': [
-            'markdown', 'gfm', 'commonmark', 'commonmark_x', 'txt', 'plain',
-            'html', 'html5', 'xhtml', 'json', 'native'
-        ],
-        
-        # E-book formats
-        'epub': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'mobi', 'fb2', 'rtf', 'txt', 'plain', 'json', 'native', 'icml',
-            'opml', 'org', 'textile', 'mediawiki', 'dokuwiki', 'haddock', 'man',
-            'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        'mobi': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'fb2', 'rtf', 'txt', 'plain', 'json',
-            'native', 'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        'fb2': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'rtf', 'txt', 'plain', 'json',
-            'native', 'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        
-        # Technical documentation formats
-        'asciidoc': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'rst', 'docx', 'odt'
-        ],
-        'rst': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'docx', 'odt'
-        ],
-        'org': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        
-        # Wiki formats
-        'mediawiki': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        'dokuwiki': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        
-        # Plain text
-        'txt': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'plain', 'json',
-            'native', 'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        'plain': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'json',
-            'native', 'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        
-        # LaTeX
-        'latex': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'epub',
-            'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain', 'json',
-            'native', 'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ],
-        'tex': [
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'epub',
-            'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain', 'json',
-            'native', 'icml', 'opml', 'org', 'textile', 'mediawiki', 'dokuwiki',
-            'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt'
-        ]
-    }
+    # Presentation formats
+    'pptx': COMMON_OUTPUT_FORMATS | SLIDE_OUTPUT_FORMATS,
     
-    # Get all supported output formats for the input formats
-    all_supported_formats = set()
-    
-    for input_format in input_formats:
-        if input_format in format_compatibility:
-            all_supported_formats.update(format_compatibility[input_format])
-    
-    # If no specific compatibility found, return common formats
-    if not all_supported_formats:
-        all_supported_formats = {
-            'html', 'html5', 'xhtml', 'markdown', 'gfm', 'commonmark', 'commonmark_x',
-            'pdf', 'latex', 'docbook', 'docbook4', 'docbook5', 'jats', 'tei',
-            'epub', 'epub2', 'epub3', 'mobi', 'fb2', 'rtf', 'txt', 'plain',
-            'json', 'native', 'icml', 'opml', 'org', 'textile', 'mediawiki',
-            'dokuwiki', 'haddock', 'man', 'ms', 'asciidoc', 'rst', 'docx', 'odt',
-            'revealjs', 'beamer', 's5', 'slideous', 'dzslides', 'slidy'
-        }
+    # Web formats
+    'html': DOCUMENT_OUTPUT_FORMATS - {'html'},
+    'htm': DOCUMENT_OUTPUT_FORMATS - {'html'},
+    
+    # Markup formats
+    'markdown': (DOCUMENT_OUTPUT_FORMATS | SLIDE_OUTPUT_FORMATS) - {'markdown'},
+    'md': (DOCUMENT_OUTPUT_FORMATS | SLIDE_OUTPUT_FORMATS) - {'markdown'},
+    'commonmark_x': (DOCUMENT_OUTPUT_FORMATS | SLIDE_OUTPUT_FORMATS) - {'commonmark_x'},
+    
+    # PDF (limited support)
+    'pdf': frozenset({
+        'markdown', 'gfm', 'commonmark', 'commonmark_x', 'txt', 'plain',
+        'html', 'html5', 'xhtml', 'json', 'native'
+    }),
+    
+    # E-book formats
+    'epub': DOCUMENT_OUTPUT_FORMATS - {'epub', 'epub2', 'epub3'},
+    'mobi': DOCUMENT_OUTPUT_FORMATS - {'mobi'},
+    'fb2': DOCUMENT_OUTPUT_FORMATS - {'fb2'},
     
-    # Sort formats for better presentation
-    return sorted(list(all_supported_formats))
+    # Technical documentation formats
+    'asciidoc': DOCUMENT_OUTPUT_FORMATS - {'asciidoc'},
+    'rst': DOCUMENT_OUTPUT_FORMATS - {'rst'},
+    'org': DOCUMENT_OUTPUT_FORMATS - {'org'},
+    
+    # Wiki formats
+    'mediawiki': DOCUMENT_OUTPUT_FORMATS - {'mediawiki'},
+    'dokuwiki': DOCUMENT_OUTPUT_FORMATS - {'dokuwiki'},
+    
+    # Plain text
+    'txt': DOCUMENT_OUTPUT_FORMATS - {'txt'},
+    'plain': DOCUMENT_OUTPUT_FORMATS - {'plain'},
+    
+    # LaTeX
+    'latex': DOCUMENT_OUTPUT_FORMATS - {'latex'},
+    'tex': DOCUMENT_OUTPUT_FORMATS - {'latex'},
+}
+
+# Offered when none of the input formats is in FORMAT_COMPATIBILITY
+DEFAULT_OUTPUT_FORMATS = DOCUMENT_OUTPUT_FORMATS | SLIDE_OUTPUT_FORMATS
+
+@functools.lru_cache(maxsize=128)
+def _supported_output_formats(input_formats: FrozenSet[str]) -> Tuple[str, ...]:
+    all_supported_formats = frozenset().union(
+        *(FORMAT_COMPATIBILITY.get(input_format, ()) for input_format in input_formats)
+    )
+    
+    # Sorted for better presentation; common formats when no compatibility is known
+    return tuple(sorted(all_supported_formats or DEFAULT_OUTPUT_FORMATS))
+
+def get_supported_output_formats(input_formats):
+    """Get list of supported output formats for given input formats"""
+    return list(_supported_output_formats(frozenset(input_formats)))
 
 @app.route('/supported-formats', methods=['POST'])
 def get_supported_formats():
@@ -1322,43 +2303,46 @@ def get_supported_formats():
         logger.error(f"Error getting supported formats: {str(e)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@functools.lru_cache(maxsize=None)
+def _all_formats_payload() -> Dict[str, Any]:
+    # Depends only on the static format tables, so it is built once per worker
+    # Get all supported input formats
+    input_formats = list(ALLOWED_EXTENSIONS)
+    
+    # Get all possible output formats
+    # Several extensions share a reader, so look each reader up only once
+    input_format_names = frozenset(INPUT_FORMAT_MAPPING.get(ext, 'markdown') for ext in ALLOWED_EXTENSIONS)
+    all_output_formats = set(_supported_output_formats(input_format_names))
+    
+    # Organize output formats by category
+    format_categories = {
+        'Web Formats': ['html', 'html5', 'xhtml'],
+        'Document Formats': ['pdf', 'docx', 'odt', 'rtf'],
+        'Markup Formats': ['markdown', 'gfm', 'commonmark', 'commonmark_x', 'markua'],
+        'E-book Formats': ['epub', 'epub2', 'epub3', 'mobi', 'fb2'],
+        'Technical Documentation': ['asciidoc', 'rst', 'org', 'textile', 'mediawiki', 'dokuwiki'],
+        'Presentation Formats': ['revealjs', 'beamer', 's5', 'slideous', 'dzslides', 'slidy'],
+        'Structured Formats': ['docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'icml'],
+        'Plain Text': ['txt', 'plain'],
+        'Other Formats': ['json', 'native', 'opml', 'haddock', 'man', 'ms', 'latex']
+    }
+    
+    organized_formats = {}
+    for category, formats in format_categories.items():
+        organized_formats[category] = [f for f in formats if f in all_output_formats]
+    
+    return {
+        'input_formats': sorted(input_formats),
+        'output_formats': sorted(list(all_output_formats)),
+        'organized_output_formats': organized_formats,
+        'message': f'Found {len(input_formats)} input formats and {len(all_output_formats)} output formats'
+    }
+
 @app.route('/all-formats', methods=['GET'])
 def get_all_formats():
     """Get all supported input and output formats"""
     try:
-        # Get all supported input formats
-        input_formats = list(ALLOWED_EXTENSIONS)
-        
-        # Get all possible output formats
-        all_output_formats = set()
-        for input_format in ALLOWED_EXTENSIONS:
-            input_format_name = get_input_format(f"test.{input_format}")
-            supported = get_supported_output_formats([input_format_name])
-            all_output_formats.update(supported)
-        
-        # Organize output formats by category
-        format_categories = {
-            'Web Formats': ['html', 'html5', 'xhtml'],
-            'Document Formats': ['pdf', 'docx', 'odt', 'rtf'],
-            'Markup Formats': ['markdown', 'gfm', 'commonmark', 'commonmark_x', 'markua'],
-            'E-book Formats': ['epub', 'epub2', 'epub3', 'mobi', 'fb2'],
-            'Technical Documentation': ['asciidoc', 'rst', 'org', 'textile', 'mediawiki', 'dokuwiki'],
-            'Presentation Formats': ['revealjs', 'beamer', 's5', 'slideous', 'dzslides', 'slidy'],
-            'Structured Formats': ['docbook', 'docbook4', 'docbook5', 'jats', 'tei', 'icml'],
-            'Plain Text': ['txt', 'plain'],
-            'Other Formats': ['json', 'native', 'opml', 'haddock', 'man', 'ms', 'latex']
-        }
-        
-        organized_formats = {}
-        for category, formats in format_categories.items():
-            organized_formats[category] = [f for f in formats if f in all_output_formats]
-        
-        return jsonify({
-            'input_formats': sorted(input_formats),
-            'output_formats': sorted(list(all_output_formats)),
-            'organized_output_formats': organized_formats,
-            'message': f'Found {len(input_formats)} input formats and {len(all_output_formats)} output formats'
-        }), 200
+        return jsonify(_all_formats_payload()), 200
         
     except Exception as e:
         logger.error(f"Error getting all formats: {str(e)}")
@@ -80,8 +80,7 @@ def demonstrate_image_handling():
         
         # Create mock media directory with sample images
         media_dir = os.path.join(temp_dir, 'media')
-        os.makedirs(media_dir, exist_ok=True)
-        os.makedirs(os.path.join(media_dir, 'subfolder'), exist_ok=True)
+        os.makedirs(os.path.join(media_dir, 'subfolder'), exist_ok=True)  # Creates media/ too
         
         # Create mock image files
         mock_images = [
@@ -90,11 +89,10 @@ def demonstrate_image_handling():
             'sample3.gif'
         ]
         
+        # media/ and media/subfolder/ already exist, so each file is a single open and write
         for img_path in mock_images:
-            full_path = os.path.join(media_dir, img_path)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, 'w') as f:
-                f.write(f"Mock image content for {img_path}")
+            with open(os.path.join(media_dir, img_path), 'wb') as f:
+                f.write(f"Mock image content for {img_path}".encode())
         
         print("✓ Created mock media files")
         
@@ -104,9 +102,8 @@ def demonstrate_image_handling():
         moved_files = organize_media_files(media_dir, img_dir)
         
         print(f"✓ Organized {len(moved_files)} media files into img/ folder")
-        if os.path.exists(img_dir):
-            img_files = os.listdir(img_dir)
-            print(f"  Files in img/: {img_files}")
+        # organize_media_files returns the paths it moved, so img/ needn't be listed
+        print(f"  Files in img/: {sorted(os.path.basename(path) for path in moved_files)}")
         
         # Demonstrate path fixing for HTML
         print("\n--- Step 2: Fixing Image Paths in HTML ---")
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings shared by every entrypoint (Dockerfile, Procfile, railway.json).
+Gunicorn reads ./gunicorn.conf.py on its own, so `gunicorn app:app` picks this up.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Conversions run in Pandoc processes, so threads in one worker convert concurrently
+# without contending on the GIL
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Each worker sizes its Pandoc and PDF pools from its share of the CPUs (cpu_count // workers,
+# see WORKER_CPUS in app.py), so the host runs about one Pandoc per CPU however many workers
+# there are. Exported here so workers see the count even when WEB_CONCURRENCY isn't set
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# gthread workers send their heartbeat from the main loop while request threads run, so this
+# doesn't bound a request (PANDOC_TIMEOUT bounds each conversion); it only restarts a worker
+# whose main loop has stopped responding for this long
+timeout = 180
+
+# Recycle a worker after this many requests; off by default because a recycled worker
+# drops the async=1 conversions still running in its background threads
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max(0, max_requests // 10)
+
+# Not preloaded: app.py creates its per-worker scratch root and starts its cleanup
+# thread at import time, and a thread does not survive a fork
+preload_app = False
+
+loglevel = 'info'
@@ -0,0 +1,61 @@
+"""
+PDF text extraction run by app.py, in the request thread or in PDF worker processes.
+Kept out of app.py so a worker process imports only PyMuPDF, not the Flask app.
+"""
+
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+# Font size ratios against a page's body text size at which a block becomes a heading
+PDF_HEADING_RATIOS = ((1.6, '#'), (1.25, '##'))
+
+def pdf_page_blocks(page) -> List[str]:
+    """Markdown paragraphs for one PDF page, with headings detected from font size"""
+    blocks = []
+    chars_by_size: Dict[float, int] = {}
+    for block in page.get_text('dict', sort=True)['blocks']:
+        if block.get('type') != 0:
+            continue
+        lines = []
+        block_size = 0.0
+        for line in block['lines']:
+            text = ''.join(span['text'] for span in line['spans']).strip()
+            if not text:
+                continue
+            lines.append(text)
+            for span in line['spans']:
+                size = round(span['size'], 1)
+                chars_by_size[size] = chars_by_size.get(size, 0) + len(span['text'])
+                block_size = max(block_size, size)
+        if lines:
+            blocks.append((block_size, lines))
+    
+    # The size covering the most characters is the body text size of the page
+    body_size = max(chars_by_size, key=chars_by_size.get) if chars_by_size else 0.0
+    paragraphs = []
+    for block_size, lines in blocks:
+        marker = next(
+            (marker for ratio, marker in PDF_HEADING_RATIOS if body_size and block_size >= body_size * ratio), None
+        )
+        if marker:
+            paragraphs.append(f"{marker} {' '.join(lines)}")
+        else:
+            paragraphs.append('\n'.join(lines))
+    return paragraphs
+
+def pdf_pages_markdown(doc, start: int, stop: int) -> bytes:
+    """UTF-8 Markdown for pages [start, stop) of an open document"""
+    # Each page is encoded as soon as it is extracted, so only its paragraphs are
+    # ever held as str rather than the whole document's
+    pages = (
+        '\n\n'.join(pdf_page_blocks(doc.load_page(page_num))).encode('utf-8')
+        for page_num in range(start, stop)
+    )
+    return b'\n\n'.join(page for page in pages if page)
+
+def pdf_page_range_markdown(pdf_path: str, start: int, stop: int) -> bytes:
+    """Markdown for pages [start, stop); runs in a PDF worker process"""
+    # Documents can't be shared across processes, so each worker opens its own
+    with fitz.open(pdf_path) as doc:
+        return pdf_pages_markdown(doc, start, stop)
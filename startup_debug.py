@@ -6,6 +6,7 @@ import os
 import sys
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -50,7 +51,17 @@ def check_dependencies():
     # Check Python version
     logger.info(f"Python version: {sys.version}")
     
-    # Check Pandoc
+    # XeLaTeX starts slowly, so it is probed in the background while Pandoc is checked;
+    # result() re-raises the probe's exceptions into check_xelatex's handlers
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        xelatex_probe = executor.submit(
+            subprocess.run, ['xelatex', '--version'], capture_output=True, text=True, timeout=10
+        )
+        check_pandoc()
+        check_xelatex(xelatex_probe)
+
+def check_pandoc():
+    """Check that Pandoc runs and log its version"""
     try:
         result = subprocess.run(['pandoc', '--version'], 
                               capture_output=True, text=True, timeout=10)
@@ -65,11 +76,11 @@ def check_dependencies():
         logger.error("Pandoc not found")
     except Exception as e:
         logger.error(f"Pandoc check error: {e}")
-    
-    # Check XeLaTeX
+
+def check_xelatex(probe):
+    """Log the outcome of the background `xelatex --version` probe"""
     try:
-        result = subprocess.run(['xelatex', '--version'], 
-                              capture_output=True, text=True, timeout=10)
+        result = probe.result()
         if result.returncode == 0:
             logger.info("XeLaTeX available")
         else:
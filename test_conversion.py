@@ -4,17 +4,32 @@ Test script to verify file conversion and media extraction functionality
 """
 
 import os
+import atexit
+import shutil
 import tempfile
-import subprocess
 import sys
-from app import convert_file_with_pandoc, get_input_format, allowed_file
+import zipfile
+from app import convert_file_with_pandoc, convert_pptx_to_markdown, get_input_format, allowed_file, iter_files, pandoc_runner
+
+# Scratch directory shared by every test in the run, created on first use and removed once at exit
+_WORKSPACE = None
+
+def workspace_dir(name):
+    """Return the shared scratch subdirectory for one test"""
+    global _WORKSPACE
+    if _WORKSPACE is None:
+        _WORKSPACE = tempfile.mkdtemp(prefix='pandoc-tests-')
+        atexit.register(shutil.rmtree, _WORKSPACE, ignore_errors=True)
+    path = os.path.join(_WORKSPACE, name)
+    os.makedirs(path, exist_ok=True)
+    return path
 
 def test_pandoc_availability():
     """Test if Pandoc is available"""
     try:
-        result = subprocess.run(['pandoc', '--version'], capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            print(f"✅ Pandoc is available: {result.stdout.split('\n')[0]}")
+        # The app looks the version up once per process, so this costs no extra Pandoc run
+        if pandoc_runner.version:
+            print(f"✅ Pandoc is available: {pandoc_runner.version}")
             return True
         else:
             print("❌ Pandoc is not available")
@@ -28,7 +43,9 @@ def test_simple_conversion():
     print("\n🔧 Testing simple conversion...")
     
     # Create a temporary markdown file with some content
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
+    output_dir = workspace_dir('simple')
+    input_file = os.path.join(output_dir, 'test_input.md')
+    with open(input_file, 'w') as f:
         f.write("""# Test Document
 
 This is a test document with some **bold** and *italic* text.
@@ -43,14 +60,10 @@ This is a test document with some **bold** and *italic* text.
 
 Some more content here.
 """)
-        input_file = f.name
     
     try:
-        # Create output directory
-        output_dir = tempfile.mkdtemp()
         output_file = os.path.join(output_dir, 'test_output.html')
         media_dir = os.path.join(output_dir, 'media')
-        os.makedirs(media_dir, exist_ok=True)
         
         # Test conversion
         success, error = convert_file_with_pandoc(
@@ -67,11 +80,6 @@ Some more content here.
         else:
             print(f"❌ Simple conversion failed: {error}")
         
-        # Clean up
-        os.unlink(input_file)
-        import shutil
-        shutil.rmtree(output_dir)
-        
         return success
         
     except Exception as e:
@@ -83,7 +91,9 @@ def test_media_extraction():
     print("\n🖼️ Testing media extraction...")
     
     # Create a temporary HTML file with embedded image
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
+    output_dir = workspace_dir('media')
+    input_file = os.path.join(output_dir, 'test_input.html')
+    with open(input_file, 'w') as f:
         f.write("""<!DOCTYPE html>
 <html>
 <head><title>Test with Media</title></head>
@@ -94,14 +104,10 @@ def test_media_extraction():
 <p>And some text content.</p>
 </body>
 </html>""")
-        input_file = f.name
     
     try:
-        # Create output directory
-        output_dir = tempfile.mkdtemp()
         output_file = os.path.join(output_dir, 'test_output.md')
         media_dir = os.path.join(output_dir, 'media')
-        os.makedirs(media_dir, exist_ok=True)
         
         # Test conversion with media extraction
         success, error = convert_file_with_pandoc(
@@ -112,11 +118,10 @@ def test_media_extraction():
             print("✅ Media extraction conversion successful")
             
             # Check if media files were extracted
-            media_files = []
-            if os.path.exists(media_dir):
-                for root, dirs, files in os.walk(media_dir):
-                    for file in files:
-                        media_files.append(os.path.join(root, file))
+            try:
+                media_files = [entry.path for entry in iter_files(media_dir)]
+            except FileNotFoundError:
+                media_files = []  # Pandoc only creates the directory when there is media
             
             if media_files:
                 print(f"   ✅ Extracted {len(media_files)} media files:")
@@ -134,23 +139,54 @@ def test_media_extraction():
         else:
             print(f"❌ Media extraction conversion failed: {error}")
         
-        # Clean up
-        os.unlink(input_file)
-        import shutil
-        shutil.rmtree(output_dir)
-        
         return success
         
     except Exception as e:
         print(f"❌ Error during media extraction test: {e}")
         return False
 
+def test_pptx_entities_not_expanded():
+    """Test that an external entity in uploaded slide XML is not read into the output"""
+    print("\n🛡️ Testing PPTX entity handling...")
+
+    output_dir = workspace_dir('pptx_entities')
+    secret_file = os.path.join(output_dir, 'secret.txt')
+    with open(secret_file, 'w') as f:
+        f.write("TOP-SECRET-CONTENT")
+
+    pml = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+    dml = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+    rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    pptx_file = os.path.join(output_dir, 'entities.pptx')
+    with zipfile.ZipFile(pptx_file, 'w') as pptx:
+        pptx.writestr('ppt/presentation.xml', f"""<?xml version="1.0"?>
+<p:presentation xmlns:p="{pml}" xmlns:r="{rel}"><p:sldIdLst><p:sldId id="256" r:id="rId1"/></p:sldIdLst></p:presentation>""")
+        pptx.writestr('ppt/_rels/presentation.xml.rels', """<?xml version="1.0"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Target="slides/slide1.xml"/></Relationships>""")
+        pptx.writestr('ppt/slides/slide1.xml', f"""<?xml version="1.0"?>
+<!DOCTYPE p:sld [<!ENTITY secret SYSTEM "file://{secret_file}">]>
+<p:sld xmlns:p="{pml}" xmlns:a="{dml}"><p:cSld><p:spTree><p:sp><p:txBody>
+<a:p><a:r><a:t>Visible &secret; text</a:t></a:r></a:p>
+</p:txBody></p:sp></p:spTree></p:cSld></p:sld>""")
+
+    markdown, error = convert_pptx_to_markdown(pptx_file)
+    if markdown is None:
+        print(f"   ❌ PPTX conversion failed: {error}")
+        return False
+
+    if b"TOP-SECRET-CONTENT" in markdown:
+        print("   ❌ External entity was expanded into the output")
+        return False
+
+    print("   ✅ External entity was left unexpanded")
+    return True
+
 def test_format_detection():
     """Test format detection"""
     print("\n🔍 Testing format detection...")
     
     test_cases = [
-        ('test.md', 'markdown'),
+        ('test.md', 'commonmark_x'),
         ('document.docx', 'docx'),
         ('presentation.pptx', 'pptx'),
         ('file.pdf', 'pdf'),
@@ -208,6 +244,7 @@ def main():
         ("File Validation", test_file_validation),
         ("Simple Conversion", test_simple_conversion),
         ("Media Extraction", test_media_extraction),
+        ("PPTX Entities", test_pptx_entities_not_expanded),
     ]
     
     results = []
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the static format tables in app.py stay free of duplicate keys
+"""
+
+import ast
+import os
+import sys
+from app import FORMAT_EXTENSIONS, INPUT_FORMAT_MAPPING, PANDOC_FORMAT_OPTIONS, map_output_format
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Module-level dict literals checked for repeated keys
+CHECKED_TABLES = ['FORMAT_COMPATIBILITY', 'FORMAT_EXTENSIONS', 'INPUT_FORMAT_MAPPING', 'OUTPUT_FORMAT_ALIASES', 'PANDOC_FORMAT_OPTIONS']
+
+def find_duplicate_keys(table_name):
+    """Return keys that appear more than once in the named dict literal in app.py"""
+    with open(APP_PATH, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == table_name for target in node.targets
+        ):
+            keys = [key.value for key in node.value.keys]
+            return sorted({key for key in keys if keys.count(key) > 1})
+
+    raise LookupError(f"{table_name} not found in app.py")
+
+def test_no_duplicate_keys():
+    """Test that no format table repeats a key (Python silently keeps the last one)"""
+    print("🧪 Testing format tables for duplicate keys...")
+
+    all_passed = True
+    for table_name in CHECKED_TABLES:
+        duplicates = find_duplicate_keys(table_name)
+        if duplicates:
+            print(f"   ❌ {table_name} repeats: {', '.join(duplicates)}")
+            all_passed = False
+        else:
+            print(f"   ✅ {table_name} has unique keys")
+
+    return all_passed
+
+def test_output_extensions():
+    """Test the extension lookup for common output formats"""
+    print("\n🔧 Testing output extensions...")
+
+    test_cases = [
+        ('gfm', 'md'),
+        ('markdown', 'md'),
+        ('html5', 'html'),
+        ('latex', 'tex'),
+        ('epub3', 'epub'),
+        ('docbook5', 'xml'),
+        ('plain', 'txt'),
+    ]
+
+    all_passed = True
+    for output_format, expected_extension in test_cases:
+        result = FORMAT_EXTENSIONS.get(output_format)
+        if result == expected_extension:
+            print(f"   ✅ '{output_format}' -> '.{result}'")
+        else:
+            print(f"   ❌ '{output_format}' -> '.{result}' (expected '.{expected_extension}')")
+            all_passed = False
+
+    # Every reader the input table maps to should be a non-empty format name
+    if not all(INPUT_FORMAT_MAPPING.values()):
+        print("   ❌ INPUT_FORMAT_MAPPING contains an empty format name")
+        all_passed = False
+
+    return all_passed
+
+def test_extensions_cover_options():
+    """Test that every output format with Pandoc options also has a file extension"""
+    print("\n📎 Testing extension coverage...")
+
+    missing = sorted(set(PANDOC_FORMAT_OPTIONS) - set(FORMAT_EXTENSIONS))
+    if missing:
+        print(f"   ❌ No extension for: {', '.join(missing)}")
+        return False
+
+    print(f"   ✅ All {len(PANDOC_FORMAT_OPTIONS)} formats with options have an extension")
+    return True
+
+def test_output_aliases():
+    """Test that output format names resolve to Pandoc writers, not to file extensions"""
+    print("\n🔀 Testing output format aliases...")
+
+    test_cases = [
+        ('gfm', 'gfm'),
+        ('GitHub', 'gfm'),
+        ('txt', 'plain'),
+        ('word', 'docx'),
+        ('html5', 'html5'),
+        ('epub3', 'epub3'),
+        ('docbook5', 'docbook5'),
+        ('texinfo', 'texinfo'),
+    ]
+
+    all_passed = True
+    for user_format, expected_format in test_cases:
+        result = map_output_format(user_format)
+        if result == expected_format:
+            print(f"   ✅ '{user_format}' -> '{result}'")
+        else:
+            print(f"   ❌ '{user_format}' -> '{result}' (expected '{expected_format}')")
+            all_passed = False
+
+    return all_passed
+
+def main():
+    """Run the tests"""
+    print("🧪 Testing Format Tables")
+    print("=" * 40)
+
+    tests = [
+        ("Duplicate Keys", test_no_duplicate_keys),
+        ("Output Extensions", test_output_extensions),
+        ("Extension Coverage", test_extensions_cover_options),
+        ("Output Aliases", test_output_aliases),
+    ]
+
+    results = []
+    for test_name, test_func in tests:
+        print(f"\n📝 Running: {test_name}")
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"❌ Test failed with exception: {e}")
+            results.append((test_name, False))
+
+    # Summary
+    print("\n" + "=" * 40)
+    print("📊 Test Results Summary:")
+    print("=" * 40)
+
+    passed = 0
+    total = len(results)
+
+    for test_name, result in results:
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} {test_name}")
+        if result:
+            passed += 1
+
+    print(f"\nOverall: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All tests passed! The format tables are consistent.")
+        return 0
+    else:
+        print("⚠️ Some tests failed. Please check the issues above.")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())